@@ -0,0 +1,152 @@
+import logging
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+
+class _PendingRequest:
+    """Single image waiting to be included in a batch"""
+
+    __slots__ = ('image', 'future', 'enqueued_at')
+
+    def __init__(self, image):
+        self.image = image
+        self.future = Future()
+        self.enqueued_at = time.monotonic()
+
+
+class BatchingScheduler:
+    """Collect concurrent inference requests per species and run them as one batched forward pass"""
+
+    def __init__(self, model_provider, max_batch_size=8, max_wait_ms=10):
+        """
+        model_provider: callable taking a species name and returning the model (or None)
+        max_batch_size: largest number of images sent to the model in one call
+        max_wait_ms: how long the first request in a batch waits for companions
+        """
+        self.model_provider = model_provider
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms) / 1000.0)
+
+        self._queues = {}
+        self._workers = {}
+        self._lock = threading.Lock()
+
+        self._stats_lock = threading.Lock()
+        self._batch_sizes = {}
+        self._requests = Counter()
+        self._batches = Counter()
+        self._queue_wait_total = Counter()
+        self._inference_time_total = Counter()
+
+    def predict(self, species, image, timeout=None):
+        """Run inference for one image, blocking until its batch has been processed"""
+        return self.submit(species, image).result(timeout=timeout)
+
+    def submit(self, species, image):
+        """Queue an image for the given species and return a Future for its results"""
+        pending = _PendingRequest(image)
+        self._get_queue(species).put(pending)
+        return pending.future
+
+    def _get_queue(self, species):
+        with self._lock:
+            species_queue = self._queues.get(species)
+            if species_queue is None:
+                species_queue = queue.Queue()
+                self._queues[species] = species_queue
+                worker = threading.Thread(
+                    target=self._worker_loop,
+                    args=(species, species_queue),
+                    name=f'batch-inference-{species}',
+                    daemon=True
+                )
+                self._workers[species] = worker
+                worker.start()
+                logger.info(f"🔄 Started batching worker for '{species}' "
+                            f"(max_batch_size={self.max_batch_size}, max_wait_ms={self.max_wait * 1000:.0f})")
+            return species_queue
+
+    def _collect_batch(self, species_queue):
+        """Block for the first request, then gather more until the batch is full or the window closes"""
+        batch = [species_queue.get()]
+        deadline = time.monotonic() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0:
+                    batch.append(species_queue.get_nowait())
+                else:
+                    batch.append(species_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _worker_loop(self, species, species_queue):
+        while True:
+            batch = self._collect_batch(species_queue)
+            batch = [pending for pending in batch if pending.future.set_running_or_notify_cancel()]
+            if batch:
+                self._run_batch(species, batch)
+
+    def _run_batch(self, species, batch):
+        started_at = time.monotonic()
+        try:
+            model = self.model_provider(species)
+            if model is None:
+                raise RuntimeError(f"Model for '{species}' is not available")
+
+            results = model([pending.image for pending in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f'Expected {len(batch)} results from batched inference, got {len(results)}')
+
+        except Exception as e:
+            logger.error(f"❌ Batched inference failed for '{species}' (batch size {len(batch)}): {e}")
+            for pending in batch:
+                pending.future.set_exception(e)
+            return
+
+        finished_at = time.monotonic()
+        for pending, result in zip(batch, results):
+            # Keep the list shape returned by a single-image model call
+            pending.future.set_result([result])
+
+        self._record_batch(species, batch, started_at, finished_at)
+
+    def _record_batch(self, species, batch, started_at, finished_at):
+        with self._stats_lock:
+            self._batch_sizes.setdefault(species, Counter())[len(batch)] += 1
+            self._requests[species] += len(batch)
+            self._batches[species] += 1
+            self._queue_wait_total[species] += sum(started_at - pending.enqueued_at for pending in batch)
+            self._inference_time_total[species] += finished_at - started_at
+
+    def get_stats(self):
+        """Achieved batch sizes and timings per species, for tuning throughput against latency"""
+        with self._stats_lock:
+            species_stats = {}
+            for species, batches in self._batches.items():
+                requests = self._requests[species]
+                species_stats[species] = {
+                    'requests': requests,
+                    'batches': batches,
+                    'avg_batch_size': round(requests / batches, 2) if batches else 0.0,
+                    'batch_size_histogram': {
+                        str(size): count for size, count in sorted(self._batch_sizes[species].items())
+                    },
+                    'avg_queue_wait_ms': round(self._queue_wait_total[species] / requests * 1000, 2) if requests else 0.0,
+                    'avg_batch_inference_ms': round(self._inference_time_total[species] / batches * 1000, 2) if batches else 0.0,
+                    'queue_depth': self._queues[species].qsize() if species in self._queues else 0
+                }
+
+        return {
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000,
+            'species': species_stats
+        }
@@ -0,0 +1,95 @@
+"""
+End-to-end latency benchmark of the chatbot's two multilingual modes.
+
+'direct' answers in the user's language with a single Gemini call; 'translate' translates the
+question to English, generates, and translates the answer back. Needs GEMINI_API_KEY:
+
+    python chat_benchmark.py --languages hi mr ta --repeat 5
+"""
+import argparse
+import json
+import logging
+import os
+import statistics
+import time
+
+from dotenv import load_dotenv
+
+import chatbot_service_new
+from chatbot_service_new import AnimalDiseaseChatbot, TRANSLATION_MODES
+
+# Sample farmer questions per language (English is used for languages without a sample)
+SAMPLE_QUESTIONS = {
+    'en': 'What are the symptoms of lumpy skin disease in cows?',
+    'hi': 'गायों में लम्पी त्वचा रोग के लक्षण क्या हैं?',
+    'mr': 'गायींमध्ये लम्पी त्वचा रोगाची लक्षणे काय आहेत?',
+    'ta': 'மாடுகளில் தோல் கழலை நோயின் அறிகுறிகள் என்ன?',
+    'te': 'ఆవులలో లంపీ చర్మ వ్యాధి లక్షణాలు ఏమిటి?',
+    'bn': 'গরুর লাম্পি স্কিন রোগের লক্ষণগুলি কী?',
+    'gu': 'ગાયોમાં લમ્પી ચામડીના રોગના લક્ષણો શું છે?',
+    'kn': 'ಹಸುಗಳಲ್ಲಿ ಲಂಪಿ ಚರ್ಮ ರೋಗದ ಲಕ್ಷಣಗಳು ಯಾವುವು?',
+    'ml': 'പശുക്കളിൽ ലംപി സ്കിൻ രോഗത്തിന്റെ ലക്ഷണങ്ങൾ എന്തൊക്കെയാണ്?',
+    'pa': 'ਗਾਵਾਂ ਵਿੱਚ ਲੰਪੀ ਚਮੜੀ ਰੋਗ ਦੇ ਲੱਛਣ ਕੀ ਹਨ?',
+    'es': '¿Cuáles son los síntomas de la dermatosis nodular en las vacas?',
+    'fr': 'Quels sont les symptômes de la dermatose nodulaire chez les vaches ?',
+    'de': 'Was sind die Symptome der Lumpy-Skin-Krankheit bei Kühen?'
+}
+
+
+def run_benchmark(chatbot, languages, repeat):
+    """Latency and language-match statistics per language and mode"""
+    report = {}
+    for language in languages:
+        question = SAMPLE_QUESTIONS.get(language, SAMPLE_QUESTIONS['en'])
+        report[language] = {}
+        for mode in TRANSLATION_MODES:
+            latencies = []
+            failures = 0
+            in_language = 0
+            for _ in range(repeat):
+                # Cold translations, so translate mode pays its real round-trips every time
+                chatbot_service_new.translation_service.cache.clear()
+                started_at = time.perf_counter()
+                result = chatbot.process_text_query(question, language, translation_mode=mode)
+                latencies.append(time.perf_counter() - started_at)
+                if not result.get('success'):
+                    failures += 1
+                elif chatbot._matches_language(result['response'], language):
+                    in_language += 1
+            report[language][mode] = {
+                'runs': repeat,
+                'failures': failures,
+                'answers_in_language': in_language,
+                'mean_s': round(statistics.mean(latencies), 3),
+                'median_s': round(statistics.median(latencies), 3),
+                'max_s': round(max(latencies), 3)
+            }
+        direct, translate = report[language]['direct'], report[language]['translate']
+        report[language]['median_saving_s'] = round(translate['median_s'] - direct['median_s'], 3)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare direct multilingual generation with translate-generate-translate')
+    parser.add_argument('--languages', nargs='+', default=['hi', 'mr', 'ta', 'en'])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    load_dotenv()
+    api_key = os.getenv('GEMINI_API_KEY')
+    if not api_key:
+        print("❌ GEMINI_API_KEY not found in environment variables")
+        return 1
+
+    chatbot = AnimalDiseaseChatbot(api_key)
+    if not chatbot.model:
+        print("❌ AI model not available")
+        return 1
+
+    print(json.dumps(run_benchmark(chatbot, args.languages, args.repeat), indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
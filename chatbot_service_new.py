@@ -3,7 +3,7 @@ import logging
 import traceback
 import json
 import time
-from datetime import datetime
+import re
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -20,6 +20,7 @@ except ImportError as e:
 
 try:
     import PyPDF2
+    from pdf_extraction import extract_relevant_text, get_extraction_executor, start_extraction_executor
     PDF_AVAILABLE = True
     logger.info("✅ PyPDF2 imported successfully")
 except ImportError as e:
@@ -30,6 +31,7 @@ try:
     from PIL import Image
     import io
     import base64
+    from image_preprocessing import decode_image
     IMAGE_PROCESSING_AVAILABLE = True
     logger.info("✅ Image processing libraries imported successfully")
 except ImportError as e:
@@ -44,6 +46,101 @@ except ImportError as e:
     logger.error(f"❌ Translation not available: {e}")
     TRANSLATION_AVAILABLE = False
 
+try:
+    from knowledge_index import KnowledgeIndex
+    KNOWLEDGE_INDEX_AVAILABLE = True
+except ImportError as e:
+    logger.error(f"❌ Knowledge index not available: {e}")
+    KNOWLEDGE_INDEX_AVAILABLE = False
+
+from upstream_executor import UpstreamExecutor, Deadline, UpstreamBusyError, UpstreamTimeoutError
+from result_cache import content_hash, create_result_cache
+from translation_service import TranslationService
+from conversation_store import format_history
+
+# Shared, bounded executor for every outbound AI call, with a cap on in-flight calls per upstream
+upstream_executor = UpstreamExecutor(
+    max_workers=int(os.getenv('AI_EXECUTOR_WORKERS', '16')),
+    limits={
+        'gemini': int(os.getenv('GEMINI_MAX_IN_FLIGHT', '8')),
+        'translation': int(os.getenv('TRANSLATION_MAX_IN_FLIGHT', '8'))
+    }
+)
+
+# Translations are cached by (text, source, target) and long texts are translated in concurrent chunks
+translation_service = TranslationService(
+    upstream_executor,
+    create_result_cache(
+        'translation',
+        int(os.getenv('TRANSLATION_CACHE_MAX_ENTRIES', '10000')),
+        int(os.getenv('TRANSLATION_CACHE_TTL_SECONDS', '604800')),
+        os.getenv('RESULT_CACHE_REDIS_URL')
+    ),
+    GoogleTranslator if TRANSLATION_AVAILABLE else None,
+    max_chunk_chars=int(os.getenv('TRANSLATION_CHUNK_CHARS', '1800'))
+)
+
+# 'direct' asks Gemini to answer in the user's language in one call; 'translate' translates the
+# question to English and the answer back. Direct answers that come back in the wrong script are translated.
+TRANSLATION_MODE = os.getenv('CHAT_TRANSLATION_MODE', 'direct')
+TRANSLATION_MODES = ('direct', 'translate')
+
+# Unicode blocks of the Indic scripts, used to confirm a direct answer is really in the requested language
+LANGUAGE_SCRIPTS = {
+    'hi': ('\u0900', '\u097f'),
+    'mr': ('\u0900', '\u097f'),
+    'bn': ('\u0980', '\u09ff'),
+    'pa': ('\u0a00', '\u0a7f'),
+    'gu': ('\u0a80', '\u0aff'),
+    'ta': ('\u0b80', '\u0bff'),
+    'te': ('\u0c00', '\u0c7f'),
+    'kn': ('\u0c80', '\u0cff'),
+    'ml': ('\u0d00', '\u0d7f')
+}
+
+# Latin-script languages cannot be told apart by script, so a direct answer is checked by counting
+# common function words of the requested language against English ones
+LANGUAGE_STOPWORDS = {
+    'en': {'the', 'and', 'is', 'are', 'of', 'to', 'with', 'your', 'this', 'that', 'it', 'for', 'should',
+           'can', 'if', 'not', 'have', 'be', 'or', 'from'},
+    'es': {'el', 'la', 'los', 'las', 'de', 'que', 'y', 'en', 'es', 'un', 'una', 'por', 'con', 'para', 'del',
+           'se', 'su', 'al', 'lo', 'no'},
+    'fr': {'le', 'la', 'les', 'des', 'est', 'et', 'un', 'une', 'du', 'que', 'pour', 'dans', 'pas', 'avec',
+           'sur', 'il', 'vous', 'votre', 'au', 'ce'},
+    'de': {'der', 'die', 'das', 'und', 'ist', 'nicht', 'ein', 'eine', 'zu', 'mit', 'den', 'dem', 'sie', 'auf',
+           'für', 'von', 'es', 'ihr', 'bei', 'wenn'}
+}
+_WORD = re.compile(r'\w+', re.UNICODE)
+
+# PDFs are read page by page and only the passages relevant to the question are sent to the model;
+# documents with at least PDF_PARALLEL_MIN_PAGES pages are extracted on a process pool
+PDF_CONTEXT_CHARS = int(os.getenv('PDF_CONTEXT_CHARS', '6000'))
+PDF_MAX_PAGES = int(os.getenv('PDF_MAX_PAGES', '500'))
+PDF_EXTRACT_WORKERS = int(os.getenv('PDF_EXTRACT_WORKERS', '2'))
+PDF_PARALLEL_MIN_PAGES = int(os.getenv('PDF_PARALLEL_MIN_PAGES', '16'))
+
+# Local reference library: top passages ground the prompt and answer questions when Gemini is unavailable
+KNOWLEDGE_INDEX_DIR = os.getenv('KNOWLEDGE_INDEX_DIR', 'data/knowledge_index')
+KNOWLEDGE_SOURCES_DIR = os.getenv('KNOWLEDGE_SOURCES_DIR', 'data/knowledge')
+KNOWLEDGE_TOP_K = int(os.getenv('KNOWLEDGE_TOP_K', '3'))
+KNOWLEDGE_MIN_SCORE = float(os.getenv('KNOWLEDGE_MIN_SCORE', '1.5'))
+
+# Characters of prior conversation included in text prompts
+CHAT_CONTEXT_CHARS = int(os.getenv('CHAT_CONTEXT_CHARS', '2000'))
+
+# Total time budget per request; each upstream call gets the smaller of its own timeout and what is left
+TEXT_QUERY_DEADLINE = 30
+IMAGE_ANALYSIS_DEADLINE = 40
+
+# Part of the file analysis cache key; bump when the image or PDF prompts change so cached answers are not reused
+ANALYSIS_PROMPT_VERSION = '1'
+
+def start_pdf_extraction_pool():
+    """Fork the PDF extraction workers (PDF_EXTRACT_WORKERS); call while the process is single-threaded"""
+    if not PDF_AVAILABLE:
+        return None
+    return start_extraction_executor(PDF_EXTRACT_WORKERS)
+
 class AnimalDiseaseChatbot:
     def __init__(self, api_key):
         """Initialize the chatbot with comprehensive error handling"""
@@ -52,10 +149,12 @@ class AnimalDiseaseChatbot:
             self.api_key = api_key
             self.model = None
             self.vision_model = None
-            self.conversation_history = []
+            self.translation_mode = TRANSLATION_MODE if TRANSLATION_MODE in TRANSLATION_MODES else 'direct'
+            self.knowledge_index = None
             
             # Initialize services step by step
             self._initialize_genai()
+            self._initialize_knowledge_index()
             
             logger.info("✅ Animal Disease Chatbot initialized successfully!")
             
@@ -113,8 +212,49 @@ class AnimalDiseaseChatbot:
             logger.error(f"❌ Failed to configure Generative AI: {e}")
             return False
     
-    def process_text_query(self, user_input, language='en'):
-        """Process text-based queries about animal diseases - optimized for speed"""
+    def _initialize_knowledge_index(self):
+        """Open the local reference index and index new or changed curated documents"""
+        try:
+            if not KNOWLEDGE_INDEX_AVAILABLE:
+                logger.warning("⚠️  Knowledge index not available")
+                return False
+            
+            self.knowledge_index = KnowledgeIndex(KNOWLEDGE_INDEX_DIR)
+            self.knowledge_index.sync_directory(KNOWLEDGE_SOURCES_DIR)
+            logger.info(f"✅ Knowledge index ready: {self.knowledge_index.get_stats()['passages']} passages")
+            return True
+        
+        except Exception as e:
+            logger.error(f"❌ Failed to open knowledge index: {e}")
+            self.knowledge_index = None
+            return False
+    
+    def _find_references(self, query, top_k=KNOWLEDGE_TOP_K):
+        """Most relevant reference passages for a question (empty when the index is unavailable)"""
+        if self.knowledge_index is None:
+            return []
+        try:
+            return self.knowledge_index.search(query, top_k=top_k, min_score=KNOWLEDGE_MIN_SCORE)
+        except Exception as e:
+            logger.warning(f"⚠️ Knowledge search failed: {e}")
+            return []
+    
+    def index_document(self, filename, data):
+        """Add an uploaded document to the reference library (skipped if already indexed)"""
+        if self.knowledge_index is None:
+            return 0
+        try:
+            return self.knowledge_index.add_file(filename, key=f'upload:{content_hash(data)}', data=data)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not index {filename}: {e}")
+            return 0
+    
+    def process_text_query(self, user_input, language='en', translation_mode=None, grounded=True, history=None):
+        """
+        Process text-based queries about animal diseases.
+        translation_mode overrides CHAT_TRANSLATION_MODE; grounded adds reference passages to the prompt;
+        history is the conversation's prior turns (oldest first).
+        """
         try:
             # Validate input
             if not user_input or not user_input.strip():
@@ -133,56 +273,20 @@ class AnimalDiseaseChatbot:
                     'type': 'text'
                 }
             
-            # Only translate if absolutely necessary (not English and translation available)
-            should_translate = language != 'en' and TRANSLATION_AVAILABLE
+            deadline = Deadline(TEXT_QUERY_DEADLINE)
             
-            # Use original input for English or if translation unavailable
-            query_text = user_input
-            if should_translate:
-                try:
-                    query_text = self._translate_text(user_input, language, 'en')
-                except Exception as trans_error:
-                    logger.warning(f"Translation failed, using original text: {trans_error}")
-                    query_text = user_input
-                    should_translate = False  # Don't translate response either
-            
-            # Create concise, optimized veterinary prompt
-            veterinary_prompt = f"""You are a veterinary AI assistant. Answer this question: {query_text}
-
-Provide:
-- Accurate, practical advice
-- Key symptoms or treatments
-- When to see a vet
-- Prevention tips if relevant
-
-Keep response focused and helpful."""
+            # Answer directly in the user's language, or translate in and out
+            veterinary_prompt, translate_back = self._plan_text_query(
+                user_input, language, translation_mode or self.translation_mode, deadline, grounded, history
+            )
             
             try:
                 logger.info("🤖 Generating text response...")
                 
-                # Generate response with timeout
-                import threading
-                import time
+                # Generate response with a 20 second timeout within the request deadline
+                result = self._generate_content(self.model, veterinary_prompt, 20, deadline, 'No response generated')
                 
-                result = {'response': None, 'error': None}
-                
-                def generate_with_timeout():
-                    try:
-                        response = self.model.generate_content(veterinary_prompt)
-                        if response and response.text:
-                            result['response'] = response.text.strip()
-                        else:
-                            result['error'] = 'No response generated'
-                    except Exception as e:
-                        result['error'] = str(e)
-                
-                # Run with 20 second timeout (reduced from unlimited)
-                generation_thread = threading.Thread(target=generate_with_timeout)
-                generation_thread.daemon = True
-                generation_thread.start()
-                generation_thread.join(timeout=20)
-                
-                if generation_thread.is_alive():
+                if result['timed_out']:
                     logger.error("❌ Text generation timed out")
                     return {
                         'success': False,
@@ -203,25 +307,7 @@ Keep response focused and helpful."""
                 if result['response']:
                     response_text = result['response']
                     
-                    # Store in conversation history
-                    try:
-                        self.conversation_history.append({
-                            'user': user_input,
-                            'assistant': response_text,
-                            'timestamp': datetime.now().isoformat(),
-                            'language': language
-                        })
-                    except:
-                        pass  # Don't fail if history storage fails
-                    
-                    # Translate back to original language only if we translated the input
-                    final_response = response_text
-                    if should_translate:
-                        try:
-                            final_response = self._translate_text(response_text, 'en', language)
-                        except Exception as trans_error:
-                            logger.warning(f"Response translation failed, using English: {trans_error}")
-                            final_response = response_text
+                    final_response = self._localize_response(response_text, language, translate_back, deadline)
                     
                     logger.info("✅ Text response generated successfully")
                     return {
@@ -256,9 +342,222 @@ Keep response focused and helpful."""
                 'type': 'text'
             }
     
+    def _generate_content(self, model, content, timeout, deadline, empty_error):
+        """Run a Gemini call on the shared upstream executor; returns {'response', 'error', 'timed_out'}"""
+        result = {'response': None, 'error': None, 'timed_out': False}
+        
+        def generate():
+            # Propagate the remaining budget so the HTTP call itself is cut off, not just abandoned
+            response = model.generate_content(
+                content,
+                request_options={'timeout': max(0.1, deadline.remaining(timeout))}
+            )
+            return response.text.strip() if response and response.text else None
+        
+        try:
+            result['response'] = upstream_executor.call('gemini', generate, timeout=timeout, deadline=deadline)
+            if not result['response']:
+                result['error'] = empty_error
+        except UpstreamTimeoutError:
+            result['timed_out'] = True
+        except UpstreamBusyError:
+            result['error'] = 'AI service is busy, please try again shortly'
+        except Exception as e:
+            result['error'] = str(e)
+        
+        return result
+    
+    def _build_veterinary_prompt(self, query_text, language_name=None, references=None, history=None):
+        """Concise veterinary prompt for a text question, optionally grounded and answered in the user's language"""
+        conversation = ''
+        if history:
+            # Most recent turns that fit the context budget, so follow-up questions keep their meaning
+            previous_turns = format_history(history, max_chars=CHAT_CONTEXT_CHARS)
+            if previous_turns:
+                conversation = f"Previous conversation:\n{previous_turns}\n\n"
+        
+        reference_notes = ''
+        if references:
+            lines = []
+            for i, reference in enumerate(references, 1):
+                page = f" (page {reference['page']})" if reference['page'] else ''
+                lines.append(f"[{i}] {reference['title']}{page}: {reference['text']}")
+            notes = '\n'.join(lines)
+            reference_notes = f"\n\nReference notes (use them where relevant):\n{notes}"
+        
+        language_instruction = ''
+        if language_name:
+            language_instruction = (
+                f"\n\nThe user writes in {language_name}. Understand the question directly and write your "
+                f"entire answer in {language_name}, keeping medicine names as they are commonly written."
+            )
+        
+        return f"""You are a veterinary AI assistant. {conversation}Answer this question: {query_text}
+
+Provide:
+- Accurate, practical advice
+- Key symptoms or treatments
+- When to see a vet
+- Prevention tips if relevant
+
+Keep response focused and helpful.{reference_notes}{language_instruction}"""
+    
+    def _language_name(self, language):
+        for entry in self.get_supported_languages():
+            if entry['code'] == language:
+                return entry['name']
+        return None
+    
+    def _plan_text_query(self, user_input, language, translation_mode, deadline, grounded=True, history=None):
+        """Prompt for a text question and whether its answer has to be translated back"""
+        def prompt(query_text, language_name=None):
+            references = self._find_references(query_text) if grounded else None
+            return self._build_veterinary_prompt(query_text, language_name, references, history)
+        
+        if language == 'en':
+            return prompt(user_input), False
+        
+        # Single call: the model reads and answers in the user's language
+        language_name = self._language_name(language)
+        if translation_mode == 'direct' and language_name:
+            return prompt(user_input, language_name), False
+        
+        if not TRANSLATION_AVAILABLE:
+            return prompt(user_input), False
+        
+        try:
+            query_text = self._translate_text(user_input, language, 'en', deadline=deadline)
+        except Exception as trans_error:
+            logger.warning(f"Translation failed, using original text: {trans_error}")
+            return prompt(user_input), False
+        return prompt(query_text), True
+    
+    def _localize_response(self, response_text, language, translate_back, deadline):
+        """Answer in the user's language, translating only in translate mode or when a direct answer came back in English"""
+        if language == 'en' or not TRANSLATION_AVAILABLE:
+            return response_text
+        if not translate_back:
+            if self._matches_language(response_text, language):
+                return response_text
+            logger.warning(f"⚠️ Direct answer was not in '{language}', falling back to translation")
+        
+        try:
+            return self._translate_text(response_text, 'en', language, deadline=deadline)
+        except Exception as trans_error:
+            logger.warning(f"Response translation failed, using English: {trans_error}")
+            return response_text
+    
+    @staticmethod
+    def _matches_language(text, language, min_ratio=0.3, min_stopwords=3):
+        """
+        Whether a direct answer is in the requested language: enough letters in the language's script,
+        or for Latin-script languages at least as many of its function words as English ones
+        """
+        script = LANGUAGE_SCRIPTS.get(language)
+        if script is not None:
+            letters = [char for char in text if char.isalpha()]
+            if not letters:
+                return True
+            in_script = sum(1 for char in letters if script[0] <= char <= script[1])
+            return in_script / len(letters) >= min_ratio
+
+        stopwords = LANGUAGE_STOPWORDS.get(language)
+        if stopwords is None:
+            return True
+        words = _WORD.findall(text.lower())
+        in_language = sum(1 for word in words if word in stopwords)
+        in_english = sum(1 for word in words if word in LANGUAGE_STOPWORDS['en'])
+        if in_language + in_english < min_stopwords:
+            # Too short to tell
+            return True
+        return in_language >= in_english
+    
+    def stream_text_query(self, user_input, language='en', translation_mode=None, grounded=True, history=None):
+        """
+        Streaming variant of process_text_query.
+        Yields {'event': 'token', 'text': ...} chunks as Gemini generates them, then a final
+        {'event': 'done', ...} carrying the same fields process_text_query returns.
+        In translate mode non-English answers are translated as a whole, so they arrive as a single chunk.
+        """
+        if not user_input or not user_input.strip():
+            yield {'event': 'done', 'success': False, 'error': 'Empty input provided', 'type': 'text'}
+            return
+        
+        if not self.model:
+            yield {
+                'event': 'done',
+                'success': False,
+                'error': 'AI model not available',
+                'fallback_response': self._get_fallback_response(user_input),
+                'type': 'text'
+            }
+            return
+        
+        deadline = Deadline(TEXT_QUERY_DEADLINE)
+        veterinary_prompt, translate_back = self._plan_text_query(
+            user_input, language, translation_mode or self.translation_mode, deadline, grounded, history
+        )
+        
+        try:
+            logger.info("🤖 Streaming text response...")
+            chunks = []
+            # The stream is consumed on this thread, so only the in-flight slot is taken from the executor
+            with upstream_executor.limit('gemini', timeout=20, deadline=deadline):
+                generation_deadline = Deadline(deadline.remaining(20))
+                stream = self.model.generate_content(
+                    veterinary_prompt,
+                    stream=True,
+                    request_options={'timeout': generation_deadline.remaining()}
+                )
+                for chunk in stream:
+                    text = getattr(chunk, 'text', '')
+                    if not text:
+                        continue
+                    chunks.append(text)
+                    if not translate_back:
+                        yield {'event': 'token', 'text': text}
+                    if generation_deadline.expired:
+                        raise UpstreamTimeoutError('Response generation timed out')
+            
+            response_text = ''.join(chunks).strip()
+            if not response_text:
+                yield {
+                    'event': 'done',
+                    'success': False,
+                    'error': 'No response generated',
+                    'fallback_response': self._get_fallback_response(user_input),
+                    'type': 'text'
+                }
+                return
+            
+            # A direct answer that needed translating is replaced by the 'done' event's response
+            final_response = self._localize_response(response_text, language, translate_back, deadline)
+            if translate_back:
+                yield {'event': 'token', 'text': final_response}
+            
+            logger.info("✅ Streamed text response successfully")
+            yield {'event': 'done', 'success': True, 'response': final_response, 'type': 'text'}
+        
+        except Exception as e:
+            logger.error(f"❌ Streaming text generation failed: {e}")
+            yield {
+                'event': 'done',
+                'success': False,
+                'error': f'Generation failed: {str(e)}',
+                'fallback_response': self._get_fallback_response(user_input),
+                'type': 'text'
+            }
+    
+    def analysis_version(self, file_ext):
+        """Model and prompt version answering a file analysis (images use the vision model, PDFs the text model)"""
+        model = self.vision_model if file_ext in ('png', 'jpg', 'jpeg', 'webp') else self.model
+        return f"{getattr(model, 'model_name', None)}:{ANALYSIS_PROMPT_VERSION}"
+    
     def analyze_image(self, image_data, question=None, language='en'):
         """Analyze uploaded images for disease detection"""
         try:
+            deadline = Deadline(IMAGE_ANALYSIS_DEADLINE)
+            
             # Check if vision model is available
             if not self.vision_model:
                 logger.warning("⚠️ Vision model not available")
@@ -276,29 +575,27 @@ Keep response focused and helpful."""
                     logger.info("📁 Processing file upload...")
                     image_bytes = image_data.read()
                     image_data.seek(0)  # Reset file pointer
-                    
-                    # Validate file size (max 10MB)
-                    if len(image_bytes) > 10 * 1024 * 1024:
-                        return {
-                            'success': False,
-                            'error': 'File too large. Please use images under 10MB.',
-                            'type': 'image_analysis'
-                        }
                         
                 elif isinstance(image_data, str):
                     # Base64 encoded image
                     logger.info("🔗 Processing base64 image...")
                     image_bytes = base64.b64decode(image_data)
                 else:
-                    # Assume bytes
+                    # Bytes-like (bytes, or a memoryview over a spooled upload)
                     image_bytes = image_data
                 
+                # Validate file size (max 10MB)
+                if len(image_bytes) > 10 * 1024 * 1024:
+                    return {
+                        'success': False,
+                        'error': 'File too large. Please use images under 10MB.',
+                        'type': 'image_analysis'
+                    }
+                
                 # Validate image format
                 try:
-                    image = Image.open(io.BytesIO(image_bytes))
-                    # Convert to RGB if needed
-                    if image.mode not in ['RGB', 'RGBA']:
-                        image = image.convert('RGB')
+                    # Decode close to the 2048px analysis size instead of full resolution
+                    image = decode_image(image_bytes, target_size=2048)
                     
                     # Resize if too large (max 2048x2048)
                     if image.width > 2048 or image.height > 2048:
@@ -330,7 +627,7 @@ Keep response focused and helpful."""
             translated_question = question
             if language != 'en' and TRANSLATION_AVAILABLE:
                 try:
-                    translated_question = self._translate_text(question, language, 'en')
+                    translated_question = self._translate_text(question, language, 'en', deadline=deadline)
                 except:
                     # If translation fails, use original question
                     translated_question = question
@@ -349,29 +646,10 @@ Be specific but concise."""
             try:
                 logger.info("🤖 Generating image analysis...")
                 
-                # Set a timeout for the API call
-                import threading
-                import time
+                # Run with a 30 second timeout within the request deadline
+                result = self._generate_content(self.vision_model, [image_prompt, image], 30, deadline, 'No analysis generated')
                 
-                result = {'response': None, 'error': None}
-                
-                def analyze_with_timeout():
-                    try:
-                        response = self.vision_model.generate_content([image_prompt, image])
-                        if response and response.text:
-                            result['response'] = response.text.strip()
-                        else:
-                            result['error'] = 'No analysis generated'
-                    except Exception as e:
-                        result['error'] = str(e)
-                
-                # Run with 30 second timeout
-                analysis_thread = threading.Thread(target=analyze_with_timeout)
-                analysis_thread.daemon = True
-                analysis_thread.start()
-                analysis_thread.join(timeout=30)
-                
-                if analysis_thread.is_alive():
+                if result['timed_out']:
                     logger.error("❌ Image analysis timed out")
                     return {
                         'success': False,
@@ -395,7 +673,7 @@ Be specific but concise."""
                     final_response = response_text
                     if language != 'en' and TRANSLATION_AVAILABLE:
                         try:
-                            final_response = self._translate_text(response_text, 'en', language)
+                            final_response = self._translate_text(response_text, 'en', language, deadline=deadline)
                         except:
                             # If translation fails, use English response
                             final_response = response_text
@@ -451,28 +729,31 @@ Be specific but concise."""
                     'type': 'pdf_analysis'
                 }
             
-            # Extract text from PDF
+            if hasattr(pdf_data, 'read'):
+                # Flask FileStorage object
+                pdf_bytes = pdf_data.read()
+                pdf_data.seek(0)  # Reset file pointer
+            else:
+                pdf_bytes = pdf_data
+            
+            # Default question if none provided (the document is then read from the start)
+            has_question = bool(question and question.strip())
+            if not has_question:
+                question = "Summarize the key information in this document related to animal health and diseases."
+            
+            # Translate question to English so it can be matched against the document
+            translated_question = self._translate_text(question, language, 'en')
+            
+            # Extract pages lazily, keeping only the passages relevant to the question
             try:
-                if hasattr(pdf_data, 'read'):
-                    # Flask FileStorage object
-                    pdf_bytes = pdf_data.read()
-                    pdf_data.seek(0)  # Reset file pointer
-                else:
-                    pdf_bytes = pdf_data
-                
-                pdf_reader = PyPDF2.PdfReader(io.BytesIO(pdf_bytes))
-                text_content = ""
-                
-                for page in pdf_reader.pages:
-                    text_content += page.extract_text() + "\n"
-                
-                if not text_content.strip():
-                    return {
-                        'success': False,
-                        'error': 'No text found in PDF',
-                        'type': 'pdf_analysis'
-                    }
-                
+                extraction = extract_relevant_text(
+                    pdf_bytes,
+                    translated_question if has_question else None,
+                    context_chars=PDF_CONTEXT_CHARS,
+                    max_pages=PDF_MAX_PAGES,
+                    executor=get_extraction_executor(),
+                    min_parallel_pages=PDF_PARALLEL_MIN_PAGES
+                )
             except Exception as pdf_error:
                 logger.error(f"❌ PDF extraction failed: {pdf_error}")
                 return {
@@ -481,23 +762,26 @@ Be specific but concise."""
                     'type': 'pdf_analysis'
                 }
             
-            # Default question if none provided
-            if not question:
-                question = "Summarize the key information in this document related to animal health and diseases."
+            if not extraction['text'].strip():
+                return {
+                    'success': False,
+                    'error': 'No text found in PDF',
+                    'type': 'pdf_analysis'
+                }
             
-            # Translate question to English if needed
-            translated_question = self._translate_text(question, language, 'en')
+            logger.info(f"📄 Using {extraction['passages_used']} passages from {extraction['pages_read']} pages"
+                        f"{' (stopped early)' if extraction['stopped_early'] else ''}")
             
             # Create combined query
-            combined_query = f"""Based on the following document content, please answer: {translated_question}
+            combined_query = f"""Based on the following excerpts from a document, please answer: {translated_question}
 
-Document content:
-{text_content[:4000]}  # Limit content to avoid token limits
+Document excerpts:
+{extraction['text']}
 
-Please provide a comprehensive answer based on the document content."""
+Please provide a comprehensive answer based on the document content and cite the page numbers you used."""
             
-            # Process as text query
-            return self.process_text_query(combined_query, language)
+            # Process as text query; the prompt is already in English, so it is never translated again
+            return self.process_text_query(combined_query, language, translation_mode='direct', grounded=False)
         
         except Exception as e:
             logger.error(f"❌ Error processing PDF: {str(e)}")
@@ -508,8 +792,8 @@ Please provide a comprehensive answer based on the document content."""
                 'type': 'pdf_analysis'
             }
     
-    def _translate_text(self, text, source_lang, target_lang):
-        """Translate text between languages - optimized for speed"""
+    def _translate_text(self, text, source_lang, target_lang, deadline=None):
+        """Translate text between languages, falling back to the original text on failure"""
         try:
             # Quick checks to avoid unnecessary translation
             if source_lang == target_lang:
@@ -521,41 +805,12 @@ Please provide a comprehensive answer based on the document content."""
             if not text or not text.strip() or len(text.strip()) < 3:
                 return text
             
-            # Skip translation for very long texts (> 1000 chars) to save time
-            if len(text) > 1000:
-                logger.info("⚡ Skipping translation for long text to improve speed")
-                return text
-            
-            # Create translator and translate with timeout
-            import threading
-            import time
-            
-            result = {'translated': None, 'error': None}
-            
-            def translate_with_timeout():
-                try:
-                    translator = GoogleTranslator(source=source_lang, target=target_lang)
-                    result['translated'] = translator.translate(text)
-                except Exception as e:
-                    result['error'] = str(e)
-            
-            # Run translation with 5 second timeout
-            translation_thread = threading.Thread(target=translate_with_timeout)
-            translation_thread.daemon = True
-            translation_thread.start()
-            translation_thread.join(timeout=5)
-            
-            if translation_thread.is_alive():
-                logger.warning("⚡ Translation timed out, using original text")
-                return text
-            
-            if result['error']:
-                logger.warning(f"⚠️ Translation failed ({source_lang} → {target_lang}): {result['error']}")
-                return text
+            # Cached chunks are reused; long texts are split and translated concurrently
+            translated = translation_service.translate(text, source_lang, target_lang, deadline=deadline)
             
-            if result['translated']:
+            if translated:
                 logger.info(f"✅ Translation completed: {source_lang} → {target_lang}")
-                return result['translated']
+                return translated
             else:
                 return text
             
@@ -566,6 +821,16 @@ Please provide a comprehensive answer based on the document content."""
     def _get_fallback_response(self, user_input):
         """Provide helpful fallback response when AI is unavailable"""
         
+        # Answer from the local reference library when it has relevant passages
+        references = self._find_references(user_input, top_k=2)
+        if references:
+            sections = '\n\n'.join(f"**{reference['title']}**\n{reference['text']}" for reference in references)
+            return f"""📚 **From the GoRakshaAI reference library:**
+
+{sections}
+
+**Always consult a qualified veterinarian for proper diagnosis and treatment.**"""
+        
         # Check for common animal health keywords
         keywords_responses = {
             'fever': '🌡️ For animal fever: Monitor temperature, ensure hydration, isolate if contagious, contact veterinarian if severe.',
@@ -621,19 +886,6 @@ I'm currently unable to provide AI-powered responses, but here's some general gu
             {'code': 'de', 'name': 'German'}
         ]
     
-    def clear_conversation(self):
-        """Clear conversation history"""
-        self.conversation_history = []
-        logger.info("✅ Conversation history cleared")
-        return {'success': True, 'message': 'Conversation cleared'}
-    
-    def get_conversation_history(self):
-        """Get conversation history"""
-        return {
-            'success': True,
-            'history': self.conversation_history[-10:]  # Return last 10 exchanges
-        }
-    
     def health_check(self):
         """Check the health of the chatbot service"""
         status = {
@@ -641,7 +893,8 @@ I'm currently unable to provide AI-powered responses, but here's some general gu
             'vision_available': self.vision_model is not None,
             'pdf_available': PDF_AVAILABLE,
             'translation_available': TRANSLATION_AVAILABLE,
-            'image_processing_available': IMAGE_PROCESSING_AVAILABLE
+            'image_processing_available': IMAGE_PROCESSING_AVAILABLE,
+            'knowledge_index_available': self.knowledge_index is not None
         }
         
         overall_health = any(status.values())
@@ -650,5 +903,7 @@ I'm currently unable to provide AI-powered responses, but here's some general gu
             'success': True,
             'healthy': overall_health,
             'services': status,
+            'upstreams': upstream_executor.get_stats(),
+            'translation': translation_service.get_stats(),
             'message': 'Service operational' if overall_health else 'Limited functionality'
         }
\ No newline at end of file
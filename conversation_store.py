@@ -0,0 +1,120 @@
+import logging
+import threading
+from collections import OrderedDict, deque
+
+logger = logging.getLogger(__name__)
+
+
+class ConversationStore:
+    """
+    Recent chat turns per conversation (user + chat session), kept in bounded ring buffers.
+    The least recently used conversations are dropped from memory past max_conversations; a
+    conversation not in memory (e.g. first request on another worker) is reloaded through `loader`.
+    New turns are handed to `writer`, which must not block (e.g. a write-behind queue).
+    """
+
+    def __init__(self, max_turns=20, max_conversations=5000, loader=None, writer=None):
+        """
+        loader: callable(conversation_id, limit) -> turns oldest first, or None
+        writer: non-blocking callable(document) persisting one turn, or None to keep turns in memory only
+        """
+        self.max_turns = max_turns
+        self.max_conversations = max_conversations
+        self.loader = loader
+        self.writer = writer
+
+        self._conversations = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _buffer(self, conversation_id):
+        """Ring buffer for a conversation, loading it on a miss (caller must not hold the lock)"""
+        with self._lock:
+            turns = self._conversations.get(conversation_id)
+            if turns is not None:
+                self._conversations.move_to_end(conversation_id)
+                return turns
+
+        loaded = []
+        if self.loader is not None:
+            try:
+                loaded = self.loader(conversation_id, self.max_turns) or []
+            except Exception as e:
+                logger.warning(f"⚠️  Could not load conversation history: {e}")
+
+        with self._lock:
+            # Another thread may have created it while we were loading
+            turns = self._conversations.get(conversation_id)
+            if turns is None:
+                turns = deque(loaded, maxlen=self.max_turns)
+                self._conversations[conversation_id] = turns
+                while len(self._conversations) > self.max_conversations:
+                    self._conversations.popitem(last=False)
+            self._conversations.move_to_end(conversation_id)
+            return turns
+
+    def refresh(self, conversation_id):
+        """
+        Merge turns persisted by other workers into the local buffer (by turn id, ordered by timestamp).
+        Local turns still waiting to be written are kept.
+        """
+        turns = self._buffer(conversation_id)
+        if self.loader is None:
+            return
+        try:
+            loaded = self.loader(conversation_id, self.max_turns) or []
+        except Exception as e:
+            logger.warning(f"⚠️  Could not load conversation history: {e}")
+            return
+
+        with self._lock:
+            merged = {turn['id']: turn for turn in loaded}
+            merged.update((turn['id'], turn) for turn in turns)
+            ordered = sorted(merged.values(), key=lambda turn: turn['timestamp'])
+            turns.clear()
+            turns.extend(ordered[-self.max_turns:])
+
+    def get_turns(self, conversation_id, limit=None):
+        """Turns of a conversation, oldest first"""
+        turns = self._buffer(conversation_id)
+        with self._lock:
+            turns = list(turns)
+        return turns[-limit:] if limit else turns
+
+    def append(self, conversation_id, turn, document=None):
+        """Record a turn; document (if given) is handed to the writer"""
+        turns = self._buffer(conversation_id)
+        with self._lock:
+            turns.append(turn)
+
+        if document is not None and self.writer is not None:
+            try:
+                self.writer(document)
+            except Exception as e:
+                logger.warning(f"⚠️  Could not persist conversation turn: {e}")
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'conversations': len(self._conversations),
+                'max_conversations': self.max_conversations,
+                'max_turns': self.max_turns
+            }
+
+
+def format_history(turns, max_chars=2000, max_answer_chars=500):
+    """
+    Prior turns as prompt text, newest kept first when the character budget runs out.
+    Long answers are shortened since the question usually carries most of the context.
+    """
+    lines = []
+    used_chars = 0
+    for turn in reversed(turns):
+        answer = turn['assistant']
+        if len(answer) > max_answer_chars:
+            answer = answer[:max_answer_chars].rsplit(' ', 1)[0] + ' ...'
+        entry = f"Farmer: {turn['user']}\nAssistant: {answer}"
+        if used_chars + len(entry) > max_chars:
+            break
+        lines.append(entry)
+        used_chars += len(entry)
+    return '\n\n'.join(reversed(lines))
@@ -0,0 +1,106 @@
+import logging
+import threading
+import time
+
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+
+class DatabaseHealthMonitor(monitoring.ServerHeartbeatListener, monitoring.ServerListener):
+    """
+    Cached MongoDB connection state fed by the driver's own server heartbeats, so request handlers
+    can check the database without a round-trip. Pass it to MongoClient(event_listeners=[...]).
+
+    The state only flips after consecutive observations (hysteresis): the database is reported down
+    once every known server has failed failure_threshold heartbeats in a row, and up again once any
+    server has answered recovery_threshold heartbeats in a row.
+    """
+
+    def __init__(self, failure_threshold=2, recovery_threshold=2):
+        self.failure_threshold = failure_threshold
+        self.recovery_threshold = recovery_threshold
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Forget all observations (new client); the state is unknown until mark_connected"""
+        with self._lock:
+            # address -> consecutive successful (positive) or failed (negative) heartbeats
+            self._servers = {}
+            self._healthy = False
+            self._last_error = None
+            self._changed_at = time.time()
+            self._transitions = 0
+            self._state = (False, "Database not initialized")
+
+    def mark_connected(self):
+        """The initial ping succeeded"""
+        with self._lock:
+            self._set_healthy(True)
+
+    def status(self):
+        """(connected, message) from the cached state; never touches the network"""
+        return self._state
+
+    # ServerHeartbeatListener
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self._observe(event.connection_id, True)
+
+    def failed(self, event):
+        self._observe(event.connection_id, False, event.reply)
+
+    # ServerListener
+    def opened(self, event):
+        with self._lock:
+            self._servers.setdefault(event.server_address, 0)
+
+    def description_changed(self, event):
+        pass
+
+    def closed(self, event):
+        with self._lock:
+            self._servers.pop(event.server_address, None)
+
+    def _observe(self, address, ok, error=None):
+        with self._lock:
+            streak = self._servers.get(address, 0)
+            if ok:
+                self._servers[address] = max(streak, 0) + 1
+            else:
+                self._servers[address] = min(streak, 0) - 1
+                self._last_error = f"{type(error).__name__}: {error}"
+
+            if self._healthy:
+                if all(streak <= -self.failure_threshold for streak in self._servers.values()):
+                    self._set_healthy(False)
+            elif any(streak >= self.recovery_threshold for streak in self._servers.values()):
+                self._set_healthy(True)
+
+    def _set_healthy(self, healthy):
+        """Record a state change (caller holds the lock)"""
+        if healthy:
+            self._state = (True, "Database connected")
+            if not self._healthy:
+                logger.info("✅ MongoDB marked available")
+        else:
+            self._state = (False, f"Database error: {self._last_error or 'no server reachable'}")
+            logger.warning(f"⚠️  MongoDB marked unavailable: {self._last_error}")
+        if healthy != self._healthy:
+            self._transitions += 1
+            self._changed_at = time.time()
+        self._healthy = healthy
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'healthy': self._healthy,
+                'message': self._state[1],
+                'servers': {f"{host}:{port}": streak for (host, port), streak in self._servers.items()},
+                'since': self._changed_at,
+                'transitions': self._transitions,
+                'last_error': self._last_error
+            }
@@ -0,0 +1,30 @@
+"""
+MongoDB index migrations.
+
+Indexes are created by an explicit deploy step instead of by every worker at startup:
+
+    flask --app app migrate-db
+"""
+import logging
+
+logger = logging.getLogger(__name__)
+
+# (collection, keys, options) - create_index is a no-op for indexes that already exist
+INDEXES = [
+    ('users', [('email', 1)], {'unique': True}),
+    ('predictions', [('user_id', 1)], {}),
+    ('predictions', [('created_at', 1)], {}),
+    ('conversations', [('conversation_id', 1), ('timestamp', -1)], {}),
+    # Shared job records are deleted by MongoDB once their expires_at has passed
+    ('jobs', [('expires_at', 1)], {'expireAfterSeconds': 0}),
+]
+
+
+def apply_migrations(db):
+    """Create every index in INDEXES; returns the index names"""
+    names = []
+    for collection_name, keys, options in INDEXES:
+        name = db[collection_name].create_index(keys, **options)
+        logger.info(f"✅ Index {collection_name}.{name} ready")
+        names.append(f"{collection_name}.{name}")
+    return names
@@ -0,0 +1,111 @@
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SPECIES_CONFIG_PATH = 'data/detection_species.json'
+
+# Inference backends a species can be served with
+SUPPORTED_BACKENDS = ('torch', 'onnx', 'openvino')
+
+
+def _default_species_config(species):
+    """Defaults for a species entry; any of these can be overridden in the config file"""
+    return {
+        'model_path': f'models/{species}_disease_best.pt',
+        'model_info': f'YOLOv8 {species.capitalize()} Disease Detection Model',
+        # 'torch' serves model_path through ultralytics; 'onnx'/'openvino' serve onnx_path through ONNX Runtime
+        'backend': 'torch',
+        'onnx_path': None,
+        'min_confidence': 0.6,
+        # Below this confidence the image is treated as not showing the species at all
+        'validation_confidence': None,
+        'validation_failed_on_no_detection': False,
+        # Optional mapping of model class names to the labels returned to clients
+        'class_labels': {},
+        'messages': {
+            'no_detection': f'No {species} detected in the image. Please upload a clear image of a {species}.',
+            'not_species': f'The uploaded image does not appear to contain a {species} or the image quality is too low. Please upload a clear image of a {species}.',
+            'low_confidence': f'Image quality is too low or does not contain a proper {species} image. Please upload a clearer image of a {species}.'
+        }
+    }
+
+
+def load_species_config(config_path=DEFAULT_SPECIES_CONFIG_PATH):
+    """Load the species detection registry, filling in defaults for anything an entry leaves out"""
+    with open(config_path, encoding='utf-8') as config_file:
+        raw_config = json.load(config_file)
+
+    species_config = {}
+    for species, entry in raw_config.items():
+        config = _default_species_config(species)
+        config.update({key: value for key, value in entry.items() if key != 'messages'})
+        config['messages'].update(entry.get('messages', {}))
+        config['species'] = species
+
+        if config['backend'] not in SUPPORTED_BACKENDS:
+            raise ValueError(f"Unsupported backend '{config['backend']}' for {species}; expected one of {SUPPORTED_BACKENDS}")
+        if config['backend'] == 'torch':
+            config['serving_path'] = config['model_path']
+        else:
+            config['serving_path'] = config['onnx_path'] or os.path.splitext(config['model_path'])[0] + '.onnx'
+        config['model_used'] = os.path.basename(config['serving_path'])
+        species_config[species] = config
+
+    logger.info(f"✅ Loaded detection config for {len(species_config)} species: {', '.join(species_config)}")
+    return species_config
+
+
+def extract_predictions(results, class_labels=None):
+    """Flatten YOLO results into a list of {'class', 'confidence'} sorted by confidence"""
+    class_labels = class_labels or {}
+    predictions = []
+    for result in results:
+        if result.boxes is None or len(result.boxes) == 0:
+            continue
+        for box in result.boxes:
+            class_id = int(box.cls[0])
+            class_name = result.names.get(class_id, str(class_id))
+            predictions.append({
+                'class': class_labels.get(class_name, class_name),
+                'confidence': float(box.conf[0])
+            })
+
+    predictions.sort(key=lambda x: x['confidence'], reverse=True)
+    return predictions
+
+
+def validate_predictions(config, predictions):
+    """Apply the species confidence thresholds; returns an error response dict, or None if accepted"""
+    messages = config['messages']
+
+    if not predictions:
+        error = {
+            'success': False,
+            'error': messages['no_detection'],
+            'confidence': 0.0
+        }
+        if config['validation_failed_on_no_detection']:
+            error['validation_failed'] = True
+        return error
+
+    max_confidence = predictions[0]['confidence']
+
+    validation_confidence = config['validation_confidence']
+    if validation_confidence is not None and max_confidence < validation_confidence:
+        return {
+            'success': False,
+            'error': messages['not_species'],
+            'validation_failed': True,
+            'confidence': max_confidence
+        }
+
+    if max_confidence < config['min_confidence']:
+        return {
+            'success': False,
+            'error': messages['low_confidence'],
+            'confidence': max_confidence
+        }
+
+    return None
@@ -0,0 +1,47 @@
+# Gunicorn configuration for GoRakshaAI
+# Usage: gunicorn -c gunicorn.conf.py app:app
+import gc
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.getenv('GUNICORN_WORKERS', '4'))
+
+# Threaded workers: a request waiting on detection or a Gemini call holds only one of its worker's
+# request threads, so logins and pages keep being served while inference runs. How many of those
+# waits run at once is capped by the inference pools (DETECTION_POOL_* / CHAT_POOL_*), which
+# answer 429 once full
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.getenv('GUNICORN_THREADS', '16'))
+
+# With PRELOAD_MODELS enabled the app (and every detection model) is imported once in the
+# master and forked into the workers, so model weights are shared copy-on-write instead of
+# being loaded again by each worker
+preload_app = os.getenv('PRELOAD_MODELS', 'false').lower() in ('1', 'true', 'yes')
+
+# The PDF extraction pool forks its processes, so it is started per worker in post_fork, while the
+# worker is still single-threaded, rather than in the (preloading) master
+os.environ['PDF_EXTRACT_POOL_AT_IMPORT'] = 'false'
+
+
+def pre_fork(server, worker):
+    # Keep objects created in the master out of GC generations so collections in the
+    # workers don't touch (and copy) the shared pages
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    import shared_models
+    shared_models.record_fork_baseline()
+
+    from chatbot_service_new import start_pdf_extraction_pool
+    start_pdf_extraction_pool()
+
+    if preload_app:
+        # The master's MongoDB client and startup threads are not usable after fork
+        from app import start_background_initialization
+        start_background_initialization()
+
+    if preload_app and os.getenv('MODEL_COW_CHECK', 'false').lower() in ('1', 'true', 'yes'):
+        from app import model_registry
+        for species in model_registry.warm_models():
+            shared_models.check_inference_page_copies(model_registry, species)
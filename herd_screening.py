@@ -0,0 +1,146 @@
+import csv
+import io
+import logging
+import os
+import zipfile
+from collections import Counter
+
+from upload_streams import upload_buffer
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = {'png', 'jpg', 'jpeg', 'webp'}
+
+
+class HerdUploadError(ValueError):
+    """A herd upload that cannot be screened (too many images, unreadable archive or CSV)"""
+    status_code = 400
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        if status_code is not None:
+            self.status_code = status_code
+
+
+class HerdImageError(Exception):
+    """One image of a herd upload that cannot be screened; reported for that image only"""
+
+
+def _is_image_name(name):
+    base = os.path.basename(name)
+    return '.' in base and not base.startswith('.') and base.rsplit('.', 1)[1].lower() in IMAGE_EXTENSIONS
+
+
+def animal_id_from_name(name):
+    """Animal id taken from an image file name (tag number photos: '1042.jpg' -> '1042')"""
+    return os.path.splitext(os.path.basename(name))[0]
+
+
+def iter_herd_images(files, max_images, max_image_bytes):
+    """
+    Yield (file name, image bytes) from uploaded images and zip archives of images, one at a time,
+    so a large archive is never held in memory at once. Archive entries are checked against
+    max_image_bytes from their headers before being decompressed; plain images spooled to disk
+    are mapped rather than read. Images that cannot be read (too large, corrupt, encrypted or
+    unsupported archive entries) are yielded with a HerdImageError in place of their bytes.
+    """
+    count = 0
+    for storage in files:
+        name = storage.filename or ''
+        if name.lower().endswith('.zip'):
+            try:
+                archive = zipfile.ZipFile(storage.stream)
+            except zipfile.BadZipFile:
+                raise HerdUploadError(f"{name} is not a valid zip archive")
+            with archive:
+                for entry in archive.infolist():
+                    if entry.is_dir() or '__MACOSX' in entry.filename or not _is_image_name(entry.filename):
+                        continue
+                    count += 1
+                    if count > max_images:
+                        raise HerdUploadError(f"A herd batch can contain at most {max_images} images")
+                    if entry.file_size > max_image_bytes:
+                        yield entry.filename, HerdImageError('Image is larger than the per-image limit')
+                        continue
+                    try:
+                        data = archive.read(entry)
+                    except Exception as e:
+                        # Bad CRC, truncated data, encryption or an unsupported compression method
+                        logger.warning(f"⚠️  Could not extract {entry.filename} from {name}: {e}")
+                        yield entry.filename, HerdImageError('The image could not be extracted from the archive')
+                        continue
+                    yield entry.filename, data
+        elif _is_image_name(name):
+            count += 1
+            if count > max_images:
+                raise HerdUploadError(f"A herd batch can contain at most {max_images} images")
+            data = upload_buffer(storage)
+            if len(data) > max_image_bytes:
+                data = HerdImageError('Image is larger than the per-image limit')
+            yield name, data
+
+
+def _split_symptoms(value):
+    for separator in ';|':
+        value = value.replace(separator, ',')
+    return [symptom.strip().lower().replace(' ', '_') for symptom in value.split(',') if symptom.strip()]
+
+
+def parse_symptom_csv(data, default_animal_type=None, max_rows=1000):
+    """
+    Symptom records from a CSV with a header row: animal_id, animal_type (optional when a default
+    is given), symptoms (separated by ';' or '|'), and optional age, weight and temperature.
+    """
+    try:
+        text = data.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        raise HerdUploadError("The symptoms CSV must be UTF-8 encoded")
+
+    reader = csv.DictReader(io.StringIO(text))
+    fields = {field.strip().lower() for field in reader.fieldnames or []}
+    if 'symptoms' not in fields:
+        raise HerdUploadError("The symptoms CSV needs a header row with a 'symptoms' column")
+
+    records = []
+    for line_number, row in enumerate(reader, start=2):
+        row = {(key or '').strip().lower(): (value or '').strip() for key, value in row.items()}
+        if not any(row.values()):
+            continue
+        if len(records) >= max_rows:
+            raise HerdUploadError(f"The symptoms CSV can contain at most {max_rows} rows")
+        animal_type = row.get('animal_type') or default_animal_type
+        if not animal_type:
+            raise HerdUploadError(f"Line {line_number}: animal_type is missing")
+        records.append({
+            'animal_id': row.get('animal_id') or f"row-{line_number}",
+            'animal_type': animal_type.lower(),
+            'symptoms': _split_symptoms(row.get('symptoms', '')),
+            'age': row.get('age') or None,
+            'weight': row.get('weight') or None,
+            'temperature': row.get('temperature') or None
+        })
+    return records
+
+
+def summarize_herd(image_results, symptom_results, contagious_diseases=()):
+    """Herd-level counts over the per-animal image and symptom results"""
+    detected = [result for result in image_results if result.get('success')]
+    conditions = Counter(result['predictions'][0]['class'] for result in detected if result.get('predictions'))
+    summary = {
+        'images': len(image_results),
+        'images_screened': len(detected),
+        'images_failed': len(image_results) - len(detected),
+        'images_from_cache': sum(1 for result in image_results if result.get('cached')),
+        'conditions': dict(conditions.most_common())
+    }
+    if symptom_results:
+        diseases = Counter(result['prediction']['disease'] for result in symptom_results)
+        summary.update({
+            'symptom_records': len(symptom_results),
+            'suspected_diseases': dict(diseases.most_common()),
+            'high_severity': [result['animal_id'] for result in symptom_results
+                              if result['prediction']['severity'] == 'High'],
+            'isolate': [result['animal_id'] for result in symptom_results
+                        if result['prediction']['disease'] in contagious_diseases]
+        })
+    return summary
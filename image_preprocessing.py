@@ -0,0 +1,61 @@
+import logging
+
+import numpy as np
+from PIL import Image
+
+from upload_streams import open_buffer
+
+logger = logging.getLogger(__name__)
+
+# Input size of the YOLO detection models
+DEFAULT_MODEL_INPUT_SIZE = 640
+
+# Modes Image.reduce() does not support -> the mode they are converted to before reducing
+_UNREDUCIBLE_MODES = {'P': 'RGB', '1': 'L', 'I;16': 'I'}
+
+
+def decode_image(image_bytes, target_size=DEFAULT_MODEL_INPUT_SIZE):
+    """
+    Decode an uploaded image directly at (roughly) the size it will be used at.
+    JPEGs are decoded in draft mode, which lets libjpeg scale by 1/2, 1/4 or 1/8 while decoding,
+    so a 12 MP phone photo never materialises at full resolution. Other formats are reduced by
+    an integer factor right after decoding. The longest side stays >= target_size.
+    image_bytes may be any bytes-like object, e.g. a memoryview over a spooled upload.
+    """
+    image = Image.open(open_buffer(image_bytes))
+
+    if image.format == 'JPEG':
+        # draft() picks the largest scale that still keeps both sides >= the requested size
+        image.draft('RGB', _draft_size(image.size, target_size))
+
+    reduce_factor = max(image.size) // target_size
+    if reduce_factor >= 2:
+        # Reduce before converting to RGB, so the full-resolution image is never copied in another mode.
+        # Palette, bilevel and 16-bit images cannot be reduced as-is and are first brought to a mode that can
+        if image.mode in _UNREDUCIBLE_MODES:
+            image = image.convert(_UNREDUCIBLE_MODES[image.mode])
+        image = image.reduce(reduce_factor)
+
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+
+    return image
+
+
+def _draft_size(size, target_size):
+    """Requested draft size preserving aspect ratio with the longest side at target_size"""
+    width, height = size
+    scale = target_size / max(width, height)
+    if scale >= 1:
+        return size
+    return max(1, int(width * scale)), max(1, int(height * scale))
+
+
+def to_model_input(image):
+    """Contiguous HWC uint8 BGR array, the layout ultralytics uses internally for inference"""
+    return np.ascontiguousarray(np.asarray(image)[:, :, ::-1])
+
+
+def prepare_for_inference(image_bytes, target_size=DEFAULT_MODEL_INPUT_SIZE):
+    """Decode upload bytes into a ready-to-infer array close to the model input size"""
+    return to_model_input(decode_image(image_bytes, target_size))
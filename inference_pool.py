@@ -0,0 +1,139 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+
+logger = logging.getLogger(__name__)
+
+
+class InferencePoolError(Exception):
+    """Base error for work the pool could not complete; carries the HTTP status to return"""
+    status_code = 503
+
+
+class PoolSaturatedError(InferencePoolError):
+    """Queue is full - the client should back off and retry"""
+    status_code = 429
+
+
+class PoolTimeoutError(InferencePoolError):
+    """Work did not complete (or start) within the deadline"""
+    status_code = 503
+
+
+class InferencePool:
+    """
+    Bounded worker pool for inference and AI calls, sized independently of the web server.
+    At most max_workers tasks run and max_queue wait; anything beyond is rejected immediately
+    so request threads are never parked behind an unbounded backlog.
+
+    run() caps concurrency but the calling request thread still waits for the result; it relies on
+    threaded web workers (see gunicorn.conf.py) so other requests are served meanwhile. Work that
+    must not hold a request at all goes through submit() or the background job API.
+    """
+
+    def __init__(self, name, max_workers=4, max_queue=16, task_timeout=30):
+        self.name = name
+        self.max_workers = max(1, int(max_workers))
+        self.max_queue = max(0, int(max_queue))
+        self.task_timeout = float(task_timeout)
+
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=f'{name}-pool')
+        self._slots = threading.BoundedSemaphore(self.max_workers + self.max_queue)
+
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._active = 0
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._timed_out = 0
+        self._queue_wait_total = 0.0
+        self._run_time_total = 0.0
+        self._started = 0
+
+    def submit(self, fn, *args, **kwargs):
+        """Queue work and return its Future; raises PoolSaturatedError when the queue is full"""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise PoolSaturatedError(f'{self.name} queue is full ({self.max_workers} running, {self.max_queue} queued)')
+
+        enqueued_at = time.monotonic()
+        with self._lock:
+            self._submitted += 1
+            self._queued += 1
+
+        def run_task():
+            started_at = time.monotonic()
+            with self._lock:
+                self._queued -= 1
+                self._active += 1
+                self._started += 1
+                self._queue_wait_total += started_at - enqueued_at
+            succeeded = False
+            try:
+                result = fn(*args, **kwargs)
+                succeeded = True
+                return result
+            finally:
+                with self._lock:
+                    self._active -= 1
+                    self._run_time_total += time.monotonic() - started_at
+                    if succeeded:
+                        self._completed += 1
+                    else:
+                        self._failed += 1
+
+        try:
+            future = self._executor.submit(run_task)
+        except Exception:
+            with self._lock:
+                self._queued -= 1
+            self._slots.release()
+            raise
+
+        future.add_done_callback(lambda _: self._on_done(future))
+        return future
+
+    def _on_done(self, future):
+        if future.cancelled():
+            with self._lock:
+                self._queued -= 1
+        self._slots.release()
+
+    def run(self, fn, *args, timeout=None, **kwargs):
+        """Run work on the pool and block the caller until its result, raising PoolTimeoutError past the deadline"""
+        future = self.submit(fn, *args, **kwargs)
+        try:
+            return future.result(timeout=self.task_timeout if timeout is None else timeout)
+        except FuturesTimeoutError:
+            # Drop it if it never started; a running task finishes but its result is discarded
+            future.cancel()
+            with self._lock:
+                self._timed_out += 1
+            logger.warning(f"⚠️  {self.name} task exceeded its {self.task_timeout:.0f}s deadline")
+            raise PoolTimeoutError(f'{self.name} task timed out')
+
+    def get_stats(self):
+        """Queue depth, utilization and timings: high queue wait means queue-bound, high run time means CPU-bound"""
+        with self._lock:
+            finished = self._completed + self._failed
+            return {
+                'max_workers': self.max_workers,
+                'max_queue': self.max_queue,
+                'queue_depth': self._queued,
+                'active': self._active,
+                'utilization': round(self._active / self.max_workers, 2),
+                'submitted': self._submitted,
+                'completed': self._completed,
+                'failed': self._failed,
+                'rejected': self._rejected,
+                'timed_out': self._timed_out,
+                'avg_queue_wait_ms': round(self._queue_wait_total / self._started * 1000, 2) if self._started else 0.0,
+                'avg_run_ms': round(self._run_time_total / finished * 1000, 2) if finished else 0.0
+            }
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,230 @@
+import copy
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_COMPLETED = 'completed'
+JOB_FAILED = 'failed'
+TERMINAL_STATUSES = (JOB_COMPLETED, JOB_FAILED)
+
+
+class MongoJobStore:
+    """
+    Persists job records so a job submitted on one worker can be polled from any other.
+    Each record carries an expires_at ttl_seconds after its last save; MongoDB removes expired
+    records through the TTL index in db_migrations.INDEXES, and load() ignores ones not yet removed.
+    """
+
+    def __init__(self, get_collection, ttl_seconds=3600):
+        # Resolved lazily because the database may connect after the job manager is created
+        self.get_collection = get_collection
+        self.ttl_seconds = ttl_seconds
+
+    def save(self, job):
+        collection = self.get_collection()
+        if collection is None:
+            return
+        document = {key: value for key, value in job.items() if key != 'version'}
+        document['expires_at'] = datetime.now(timezone.utc) + timedelta(seconds=self.ttl_seconds)
+        collection.replace_one({'_id': job['id']}, {'_id': job['id'], **document}, upsert=True)
+
+    def load(self, job_id):
+        collection = self.get_collection()
+        if collection is None:
+            return None
+        document = collection.find_one({'_id': job_id})
+        if document is None:
+            return None
+        expires_at = document.pop('expires_at', None)
+        if expires_at is not None:
+            # pymongo returns naive UTC datetimes unless the client is tz_aware
+            if expires_at.tzinfo is None:
+                expires_at = expires_at.replace(tzinfo=timezone.utc)
+            if expires_at <= datetime.now(timezone.utc):
+                return None
+        document.pop('_id', None)
+        document['version'] = 0
+        return document
+
+
+class JobManager:
+    """Runs long analyses in the background and tracks their status for polling or streaming"""
+
+    def __init__(self, pool, ttl_seconds=3600, max_jobs=1000, store=None):
+        """
+        pool: InferencePool the jobs run on (its queue bounds how many jobs can be pending)
+        ttl_seconds: how long finished jobs stay retrievable
+        max_jobs: upper bound on job records kept in memory
+        store: optional shared store (e.g. MongoJobStore) for cross-worker lookups
+        """
+        self.pool = pool
+        self.ttl_seconds = ttl_seconds
+        self.max_jobs = max_jobs
+        self.store = store
+
+        self._jobs = OrderedDict()
+        self._changed = threading.Condition()
+
+    def submit(self, kind, fn, *args, owner=None, **kwargs):
+        """Start fn(*args, **kwargs) in the background and return the new job record"""
+        job = {
+            'id': uuid.uuid4().hex,
+            'kind': kind,
+            'owner': owner,
+            'status': JOB_QUEUED,
+            'result': None,
+            'error': None,
+            'status_code': None,
+            'created_at': _now(),
+            'started_at': None,
+            'finished_at': None,
+            'version': 0
+        }
+
+        with self._changed:
+            self._prune()
+            self._jobs[job['id']] = job
+        self._persist(job)
+
+        try:
+            self.pool.submit(self._run, job['id'], fn, args, kwargs)
+        except Exception:
+            with self._changed:
+                self._jobs.pop(job['id'], None)
+            raise
+
+        return copy.deepcopy(job)
+
+    def _run(self, job_id, fn, args, kwargs):
+        self._update(job_id, status=JOB_RUNNING, started_at=_now())
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            logger.error(f"❌ Job {job_id} failed: {e}")
+            self._update(job_id, status=JOB_FAILED, error=str(e),
+                         status_code=getattr(e, 'status_code', 500), finished_at=_now())
+            return
+        self._update(job_id, status=JOB_COMPLETED, result=result, finished_at=_now())
+
+    def _update(self, job_id, **changes):
+        with self._changed:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job.update(changes)
+            job['version'] += 1
+            snapshot = copy.deepcopy(job)
+            self._changed.notify_all()
+        if snapshot['status'] in TERMINAL_STATUSES:
+            self._persist(snapshot)
+
+    def _persist(self, job):
+        if self.store is None:
+            return
+        try:
+            self.store.save(job)
+        except Exception as e:
+            logger.warning(f"⚠️  Could not persist job {job['id']}: {e}")
+
+    def _prune(self):
+        """Drop expired finished jobs and cap the number kept in memory (caller holds the lock)"""
+        cutoff = time.time() - self.ttl_seconds
+        for job_id in list(self._jobs):
+            job = self._jobs[job_id]
+            if job['status'] in TERMINAL_STATUSES and job['finished_at'] and _timestamp(job['finished_at']) < cutoff:
+                del self._jobs[job_id]
+        while len(self._jobs) >= self.max_jobs:
+            self._jobs.popitem(last=False)
+
+    def get(self, job_id):
+        """Current job record, looking in the shared store if another worker owns it"""
+        with self._changed:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return copy.deepcopy(job)
+
+        if self.store is not None:
+            try:
+                return self.store.load(job_id)
+            except Exception as e:
+                logger.warning(f"⚠️  Could not load job {job_id}: {e}")
+        return None
+
+    def wait_for_update(self, job_id, last_version, timeout):
+        """Block until the job changes past last_version (or timeout) and return it"""
+        deadline = time.monotonic() + timeout
+        with self._changed:
+            while True:
+                job = self._jobs.get(job_id)
+                if job is None:
+                    break
+                if job['version'] > last_version or job['status'] in TERMINAL_STATUSES:
+                    return copy.deepcopy(job)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return copy.deepcopy(job)
+                self._changed.wait(remaining)
+
+        # Job lives on another worker: fall back to polling the shared store
+        time.sleep(min(timeout, 1.0))
+        return self.get(job_id)
+
+    def stream_events(self, job_id, keepalive_seconds=15):
+        """Server-Sent Events for a job's status changes, ending with its final result"""
+        last_version = -1
+        last_status = None
+        while True:
+            job = self.wait_for_update(job_id, last_version, keepalive_seconds)
+            if job is None:
+                yield _sse('error', {'success': False, 'error': 'Job not found'})
+                return
+
+            if job['version'] != last_version or job['status'] != last_status:
+                last_version, last_status = job['version'], job['status']
+                yield _sse(job['status'], public_job(job))
+            else:
+                yield ': keep-alive\n\n'
+
+            if job['status'] in TERMINAL_STATUSES:
+                return
+
+    def get_stats(self):
+        with self._changed:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job['status']] = counts.get(job['status'], 0) + 1
+            return {'jobs': len(self._jobs), 'by_status': counts, 'pool': self.pool.get_stats()}
+
+
+def public_job(job):
+    """Job record as returned to clients"""
+    return {
+        'job_id': job['id'],
+        'kind': job['kind'],
+        'status': job['status'],
+        'result': job['result'],
+        'error': job['error'],
+        'created_at': job['created_at'],
+        'started_at': job['started_at'],
+        'finished_at': job['finished_at']
+    }
+
+
+def _sse(event, data):
+    return f'event: {event}\ndata: {json.dumps(data)}\n\n'
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _timestamp(iso_time):
+    return datetime.fromisoformat(iso_time).timestamp()
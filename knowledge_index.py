@@ -0,0 +1,373 @@
+"""
+Local BM25 index over veterinary reference documents (curated disease sheets and PDFs).
+
+Documents are added incrementally: every indexing run writes a new immutable segment whose postings
+are NumPy arrays memory-mapped at query time, so adding a document never rebuilds the index.
+
+    python knowledge_index.py sync data/knowledge
+    python knowledge_index.py add reports/lsd_guidelines.pdf
+    python knowledge_index.py search "lumpy skin disease vaccination"
+"""
+import argparse
+import hashlib
+import json
+import logging
+import math
+import mmap
+import os
+import re
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+
+import numpy as np
+
+from pdf_extraction import PDF_AVAILABLE, iter_page_texts, split_passages, tokenize
+
+logger = logging.getLogger(__name__)
+
+# Serializes writers across worker processes (POSIX only; single-process elsewhere)
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+SOURCE_EXTENSIONS = ('.md', '.txt', '.pdf')
+MANIFEST = 'manifest.json'
+_HEADING = re.compile(r'^(#{1,6})\s+(.*)$', re.MULTILINE)
+
+
+class _Segment:
+    """One immutable batch of indexed passages, memory-mapped from disk"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'terms.json'), encoding='utf-8') as f:
+            self.terms = json.load(f)
+        with open(os.path.join(path, 'passages.json'), encoding='utf-8') as f:
+            self.passages = json.load(f)
+        self.posting_ids = np.load(os.path.join(path, 'posting_ids.npy'), mmap_mode='r')
+        self.posting_tfs = np.load(os.path.join(path, 'posting_tfs.npy'), mmap_mode='r')
+        self.lengths = np.load(os.path.join(path, 'lengths.npy'), mmap_mode='r')
+        self.text_offsets = np.load(os.path.join(path, 'text_offsets.npy'), mmap_mode='r')
+        with open(os.path.join(path, 'texts.bin'), 'rb') as f:
+            self.texts = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else b''
+        self.total_length = int(np.sum(self.lengths))
+
+    def text(self, passage_id):
+        start, end = int(self.text_offsets[passage_id]), int(self.text_offsets[passage_id + 1])
+        return self.texts[start:end].decode('utf-8')
+
+    def postings(self, term):
+        bounds = self.terms.get(term)
+        if bounds is None:
+            return None, None
+        return self.posting_ids[bounds[0]:bounds[1]], self.posting_tfs[bounds[0]:bounds[1]]
+
+
+def _write_segment(path, passages):
+    """Write passages ({'document', 'hash', 'title', 'page', 'text'}) as a new segment directory"""
+    postings = defaultdict(list)
+    lengths = []
+    encoded_texts = []
+    for passage_id, passage in enumerate(passages):
+        counts = Counter(tokenize(passage['text']))
+        lengths.append(sum(counts.values()))
+        encoded_texts.append(passage['text'].encode('utf-8'))
+        for term, tf in counts.items():
+            postings[term].append((passage_id, tf))
+
+    terms = {}
+    posting_ids = []
+    posting_tfs = []
+    for term in sorted(postings):
+        terms[term] = [len(posting_ids), len(posting_ids) + len(postings[term])]
+        for passage_id, tf in postings[term]:
+            posting_ids.append(passage_id)
+            posting_tfs.append(tf)
+
+    os.makedirs(path)
+    np.save(os.path.join(path, 'posting_ids.npy'), np.asarray(posting_ids, dtype=np.int32))
+    np.save(os.path.join(path, 'posting_tfs.npy'), np.asarray(posting_tfs, dtype=np.float32))
+    np.save(os.path.join(path, 'lengths.npy'), np.asarray(lengths, dtype=np.float32))
+    np.save(os.path.join(path, 'text_offsets.npy'),
+            np.concatenate([[0], np.cumsum([len(text) for text in encoded_texts], dtype=np.int64)]).astype(np.int64))
+    with open(os.path.join(path, 'texts.bin'), 'wb') as f:
+        f.write(b''.join(encoded_texts))
+    with open(os.path.join(path, 'terms.json'), 'w', encoding='utf-8') as f:
+        json.dump(terms, f)
+    with open(os.path.join(path, 'passages.json'), 'w', encoding='utf-8') as f:
+        json.dump([{key: passage[key] for key in ('document', 'hash', 'title', 'page')} for passage in passages], f)
+
+
+def read_text_passages(text, title):
+    """Passages of a markdown/text document, split per section and prefixed with the section heading"""
+    passages = []
+    headings = list(_HEADING.finditer(text))
+    sections = [(None, text[:headings[0].start()] if headings else text)]
+    for i, match in enumerate(headings):
+        end = headings[i + 1].start() if i + 1 < len(headings) else len(text)
+        sections.append((match.group(2).strip(), text[match.end():end]))
+
+    for heading, body in sections:
+        prefix = f'{title} - {heading}: ' if heading and heading != title else f'{title}: '
+        for passage in split_passages(None, body):
+            passages.append({'page': None, 'text': prefix + passage['text']})
+    return passages
+
+
+def read_document_passages(path, data=None):
+    """Title and passages of a .md/.txt/.pdf source file (or its raw bytes)"""
+    if data is None:
+        with open(path, 'rb') as f:
+            data = f.read()
+    name = os.path.splitext(os.path.basename(path))[0].replace('_', ' ').title()
+
+    if path.lower().endswith('.pdf'):
+        if not PDF_AVAILABLE:
+            raise RuntimeError('PyPDF2 is not installed')
+        passages = []
+        for page_number, page_text in iter_page_texts(data):
+            passages.extend({'page': p['page'], 'text': p['text']} for p in split_passages(page_number + 1, page_text))
+        return name, passages
+
+    text = data.decode('utf-8', errors='replace')
+    first_heading = _HEADING.search(text)
+    title = first_heading.group(2).strip() if first_heading else name
+    return title, read_text_passages(text, title)
+
+
+class KnowledgeIndex:
+    """Incrementally built BM25 index stored as memory-mapped segments under one directory"""
+
+    def __init__(self, directory, refresh_seconds=5.0, k1=1.5, b=0.75):
+        self.directory = directory
+        self.refresh_seconds = refresh_seconds
+        self.k1 = k1
+        self.b = b
+
+        self._lock = threading.Lock()
+        self._segments = {}
+        self._documents = {}
+        self._manifest_mtime = None
+        self._checked_at = 0.0
+        os.makedirs(directory, exist_ok=True)
+        self._refresh(force=True)
+
+    # ----- manifest and segments -----
+
+    def _manifest_path(self):
+        return os.path.join(self.directory, MANIFEST)
+
+    def _read_manifest(self):
+        try:
+            with open(self._manifest_path(), encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'segments': [], 'documents': {}}
+
+    def _refresh(self, force=False):
+        """Pick up segments added by other processes (checked at most every refresh_seconds)"""
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.refresh_seconds:
+            return
+        self._checked_at = now
+        try:
+            mtime = os.stat(self._manifest_path()).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if not force and mtime == self._manifest_mtime:
+            return
+
+        manifest = self._read_manifest()
+        segments = {}
+        for name in manifest['segments']:
+            segment = self._segments.get(name)
+            if segment is None:
+                try:
+                    segment = _Segment(os.path.join(self.directory, name))
+                except Exception as e:
+                    logger.warning(f"⚠️  Skipping unreadable knowledge segment {name}: {e}")
+                    continue
+            segments[name] = segment
+
+        with self._lock:
+            self._segments = segments
+            self._documents = manifest['documents']
+            self._manifest_mtime = mtime
+
+    def _write_lock(self):
+        lock_file = open(os.path.join(self.directory, '.lock'), 'w')
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        return lock_file
+
+    # ----- indexing -----
+
+    def add_documents(self, documents):
+        """
+        Index documents given as (key, data_or_None, source_path) without touching existing segments.
+        Documents whose content hash is already indexed under the same key are skipped;
+        a changed document supersedes its earlier passages.
+        """
+        lock_file = self._write_lock()
+        try:
+            manifest = self._read_manifest()
+            passages = []
+            updated = {}
+            for key, data, path in documents:
+                if data is None:
+                    with open(path, 'rb') as f:
+                        data = f.read()
+                content_hash = hashlib.blake2b(data, digest_size=16).hexdigest()
+                if manifest['documents'].get(key, {}).get('hash') == content_hash:
+                    continue
+                try:
+                    title, document_passages = read_document_passages(path, data)
+                except Exception as e:
+                    logger.warning(f"⚠️  Could not index {path}: {e}")
+                    continue
+                for passage in document_passages:
+                    passages.append({'document': key, 'hash': content_hash, 'title': title, **passage})
+                updated[key] = {'hash': content_hash, 'title': title, 'passages': len(document_passages)}
+
+            if not updated:
+                return 0
+
+            if passages:
+                name = f'segment-{uuid.uuid4().hex[:12]}'
+                _write_segment(os.path.join(self.directory, name), passages)
+                manifest['segments'].append(name)
+            manifest['documents'].update(updated)
+
+            # Readers see either the old or the new manifest, never a partial one
+            temp_path = self._manifest_path() + '.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, indent=2)
+            os.replace(temp_path, self._manifest_path())
+            logger.info(f"📚 Indexed {len(updated)} document(s), {len(passages)} passages")
+        finally:
+            lock_file.close()
+
+        self._refresh(force=True)
+        return len(updated)
+
+    def add_file(self, path, key=None, data=None):
+        """Index a single file (or its bytes) under a stable key"""
+        return self.add_documents([(key or os.path.abspath(path), data, path)])
+
+    def sync_directory(self, source_dir):
+        """Index new or changed source files in a directory"""
+        if not os.path.isdir(source_dir):
+            return 0
+        documents = []
+        for root, _, files in os.walk(source_dir):
+            for filename in sorted(files):
+                if filename.lower().endswith(SOURCE_EXTENSIONS):
+                    path = os.path.join(root, filename)
+                    documents.append((os.path.relpath(path, source_dir), None, path))
+        return self.add_documents(documents)
+
+    # ----- search -----
+
+    def search(self, query, top_k=3, min_score=0.0):
+        """Top passages for a query: [{'title', 'page', 'text', 'score', 'document'}]"""
+        self._refresh()
+        terms = set(tokenize(query))
+        with self._lock:
+            segments = list(self._segments.values())
+            documents = self._documents
+        if not terms or not segments:
+            return []
+
+        total_passages = sum(len(segment.passages) for segment in segments)
+        average_length = sum(segment.total_length for segment in segments) / max(1, total_passages) or 1.0
+
+        # Corpus-wide document frequencies (superseded passages are counted; they are rare and only shift IDF slightly)
+        idf = {}
+        for term in terms:
+            frequency = sum(len(segment.postings(term)[0]) for segment in segments if term in segment.terms)
+            if frequency:
+                idf[term] = math.log(1 + (total_passages - frequency + 0.5) / (frequency + 0.5))
+
+        candidates = []
+        for segment in segments:
+            scores = np.zeros(len(segment.passages), dtype=np.float32)
+            for term, term_idf in idf.items():
+                ids, tfs = segment.postings(term)
+                if ids is None:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * segment.lengths[ids] / average_length)
+                scores[ids] += term_idf * tfs * (self.k1 + 1) / (tfs + norm)
+
+            # Extra candidates so superseded passages can be dropped without losing results
+            count = min(len(scores), top_k * 4)
+            for passage_id in np.argpartition(-scores, count - 1)[:count]:
+                score = float(scores[passage_id])
+                if score <= min_score:
+                    continue
+                meta = segment.passages[passage_id]
+                if documents.get(meta['document'], {}).get('hash') != meta['hash']:
+                    continue
+                candidates.append((score, segment, int(passage_id)))
+
+        candidates.sort(key=lambda candidate: -candidate[0])
+        return [
+            {
+                'document': segment.passages[passage_id]['document'],
+                'title': segment.passages[passage_id]['title'],
+                'page': segment.passages[passage_id]['page'],
+                'text': segment.text(passage_id),
+                'score': round(score, 3)
+            }
+            for score, segment, passage_id in candidates[:top_k]
+        ]
+
+    def get_stats(self):
+        self._refresh()
+        with self._lock:
+            return {
+                'documents': len(self._documents),
+                'segments': len(self._segments),
+                'passages': sum(len(segment.passages) for segment in self._segments.values())
+            }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build and query the local veterinary knowledge index')
+    parser.add_argument('--index-dir', default=os.getenv('KNOWLEDGE_INDEX_DIR', 'data/knowledge_index'))
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    sync_parser = subparsers.add_parser('sync', help='Index new or changed files in a source directory')
+    sync_parser.add_argument('source_dir', nargs='?', default=os.getenv('KNOWLEDGE_SOURCES_DIR', 'data/knowledge'))
+
+    add_parser = subparsers.add_parser('add', help='Index individual .md/.txt/.pdf files')
+    add_parser.add_argument('paths', nargs='+')
+
+    search_parser = subparsers.add_parser('search', help='Show the top passages for a query')
+    search_parser.add_argument('query')
+    search_parser.add_argument('--top-k', type=int, default=3)
+
+    subparsers.add_parser('stats', help='Show index size')
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    index = KnowledgeIndex(args.index_dir)
+
+    if args.command == 'sync':
+        print(f"📚 Indexed {index.sync_directory(args.source_dir)} new or changed document(s)")
+    elif args.command == 'add':
+        print(f"📚 Indexed {index.add_documents([(os.path.abspath(path), None, path) for path in args.paths])} document(s)")
+    elif args.command == 'search':
+        started_at = time.perf_counter()
+        results = index.search(args.query, top_k=args.top_k)
+        print(json.dumps({'elapsed_ms': round((time.perf_counter() - started_at) * 1000, 2), 'results': results},
+                         indent=2, ensure_ascii=False))
+    else:
+        print(json.dumps(index.get_stats(), indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
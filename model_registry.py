@@ -0,0 +1,153 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+def load_yolo_model(model_path):
+    """Load a YOLO model, importing torch/ultralytics only when the first model is needed"""
+    from ultralytics import YOLO
+    return YOLO(model_path)
+
+
+class ModelRegistry:
+    """Species model registry that loads models on first use and keeps the most recently used ones resident"""
+
+    def __init__(self, model_paths, max_resident=3, loader=load_yolo_model, loaders=None):
+        """
+        model_paths: mapping of species name to model file path
+        max_resident: how many models may be held in memory at once (LRU eviction beyond that)
+        loader: callable turning a model path into a model object
+        loaders: optional per-species loaders overriding the default one (e.g. ONNX-served species)
+        """
+        self.model_paths = dict(model_paths)
+        self.max_resident = max(1, int(max_resident))
+        self.loader = loader
+        self.loaders = dict(loaders or {})
+
+        self._resident = OrderedDict()
+        self._load_locks = {}
+        self._lock = threading.Lock()
+
+        self._load_counts = {}
+        self._load_times = {}
+        self._evictions = 0
+        self._hits = 0
+        self._misses = 0
+
+    def is_available(self, species):
+        """Whether a model file exists for the species (without loading it)"""
+        model_path = self.model_paths.get(species)
+        return model_path is not None and os.path.exists(model_path)
+
+    def model_version(self, species):
+        """Identity of the model file on disk, changing whenever the file is replaced"""
+        model_path = self.model_paths.get(species)
+        try:
+            stat = os.stat(model_path)
+        except (OSError, TypeError):
+            return None
+        return f'{os.path.basename(model_path)}:{stat.st_size}:{int(stat.st_mtime)}'
+
+    def get(self, species):
+        """Return the loaded model for a species, loading it on first use; None if no model file exists"""
+        with self._lock:
+            model = self._get_resident(species)
+            if model is not None:
+                self._hits += 1
+                return model
+            if species not in self.model_paths:
+                return None
+            load_lock = self._load_locks.setdefault(species, threading.Lock())
+
+        # Single-flight: concurrent first requests wait for one load instead of loading twice
+        with load_lock:
+            with self._lock:
+                model = self._get_resident(species)
+                if model is not None:
+                    self._hits += 1
+                    return model
+                self._misses += 1
+
+            model_path = self.model_paths[species]
+            if not os.path.exists(model_path):
+                logger.warning(f"⚠️  {species.capitalize()} disease model not found at {model_path}")
+                return None
+
+            logger.info(f"🔄 Loading {species} disease model from {model_path}...")
+            started_at = time.monotonic()
+            try:
+                model = self.loaders.get(species, self.loader)(model_path)
+            except Exception as e:
+                logger.error(f"❌ Error loading {species} disease model: {e}")
+                raise
+            load_time = time.monotonic() - started_at
+            logger.info(f"✅ {species.capitalize()} disease model loaded in {load_time:.2f}s")
+
+            with self._lock:
+                self._resident[species] = model
+                self._load_counts[species] = self._load_counts.get(species, 0) + 1
+                self._load_times[species] = load_time
+                self._evict_over_capacity()
+
+            return model
+
+    def peek(self, species):
+        """Return the resident model for a species without loading it or changing LRU order"""
+        with self._lock:
+            return self._resident.get(species)
+
+    def preload(self):
+        """Load every available model now, growing max_resident so none of them is evicted"""
+        available = [species for species in self.model_paths if self.is_available(species)]
+        if len(available) > self.max_resident:
+            logger.warning(f"⚠️  Raising max_resident from {self.max_resident} to {len(available)} to preload all models")
+            self.max_resident = len(available)
+
+        loaded = []
+        for species in available:
+            if self.get(species) is not None:
+                loaded.append(species)
+        return loaded
+
+    def _get_resident(self, species):
+        model = self._resident.get(species)
+        if model is not None:
+            self._resident.move_to_end(species)
+        return model
+
+    def _evict_over_capacity(self):
+        while len(self._resident) > self.max_resident:
+            evicted_species, _ = self._resident.popitem(last=False)
+            self._evictions += 1
+            logger.info(f"♻️  Evicted {evicted_species} disease model (max_resident={self.max_resident})")
+
+    def warm_models(self):
+        """Species whose models are currently resident, most recently used last"""
+        with self._lock:
+            return list(self._resident.keys())
+
+    def get_status(self):
+        """Availability, residency and load statistics for every registered species"""
+        with self._lock:
+            species_status = {
+                species: {
+                    'model_path': model_path,
+                    'available': os.path.exists(model_path),
+                    'warm': species in self._resident,
+                    'load_count': self._load_counts.get(species, 0),
+                    'last_load_seconds': round(self._load_times[species], 3) if species in self._load_times else None
+                }
+                for species, model_path in self.model_paths.items()
+            }
+            return {
+                'max_resident': self.max_resident,
+                'warm_models': list(self._resident.keys()),
+                'hits': self._hits,
+                'misses': self._misses,
+                'evictions': self._evictions,
+                'species': species_status
+            }
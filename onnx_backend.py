@@ -0,0 +1,295 @@
+"""
+ONNX Runtime inference backend for the YOLOv8 detection models.
+
+Serving workers only need onnxruntime and numpy; torch/ultralytics are imported solely by the
+export and parity-check commands:
+
+    python onnx_backend.py export models/lumpy_disease_best.pt --int8 --parity-images samples/
+    python onnx_backend.py parity models/lumpy_disease_best.pt models/lumpy_disease_best.onnx samples/
+"""
+import argparse
+import ast
+import json
+import logging
+import os
+
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+try:
+    import onnxruntime as ort
+    ONNXRUNTIME_AVAILABLE = True
+except ImportError:
+    ort = None
+    ONNXRUNTIME_AVAILABLE = False
+
+# Execution providers per configured backend name
+BACKEND_PROVIDERS = {
+    'onnx': ['CPUExecutionProvider'],
+    'openvino': ['OpenVINOExecutionProvider', 'CPUExecutionProvider']
+}
+
+# Same defaults ultralytics uses for prediction
+DEFAULT_CONF_THRESHOLD = 0.25
+DEFAULT_IOU_THRESHOLD = 0.7
+DEFAULT_MAX_DETECTIONS = 300
+LETTERBOX_PAD_VALUE = 114
+
+
+class DetectionBoxes:
+    """Minimal stand-in for ultralytics Boxes: per-detection cls/conf/xyxy arrays"""
+
+    def __init__(self, xyxy, conf, cls):
+        self.xyxy = xyxy
+        self.conf = conf
+        self.cls = cls
+
+    def __len__(self):
+        return len(self.conf)
+
+    def __iter__(self):
+        for i in range(len(self.conf)):
+            yield DetectionBoxes(self.xyxy[i:i + 1], self.conf[i:i + 1], self.cls[i:i + 1])
+
+
+class DetectionResult:
+    """Minimal stand-in for ultralytics Results with the fields the detection pipeline reads"""
+
+    def __init__(self, boxes, names):
+        self.boxes = boxes
+        self.names = names
+
+
+class OnnxYoloModel:
+    """YOLOv8 detection model exported to ONNX, run through ONNX Runtime"""
+
+    def __init__(self, onnx_path, backend='onnx', conf_threshold=DEFAULT_CONF_THRESHOLD,
+                 iou_threshold=DEFAULT_IOU_THRESHOLD, max_detections=DEFAULT_MAX_DETECTIONS):
+        if not ONNXRUNTIME_AVAILABLE:
+            raise RuntimeError('onnxruntime is not installed')
+
+        self.onnx_path = onnx_path
+        self.conf_threshold = conf_threshold
+        self.iou_threshold = iou_threshold
+        self.max_detections = max_detections
+
+        session_options = ort.SessionOptions()
+        session_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        intra_op_threads = int(os.getenv('ONNX_INTRA_OP_THREADS', '0'))
+        if intra_op_threads > 0:
+            session_options.intra_op_num_threads = intra_op_threads
+
+        available_providers = ort.get_available_providers()
+        providers = [p for p in BACKEND_PROVIDERS.get(backend, BACKEND_PROVIDERS['onnx']) if p in available_providers]
+        if backend == 'openvino' and 'OpenVINOExecutionProvider' not in providers:
+            logger.warning("⚠️  OpenVINO execution provider not available, falling back to CPU")
+
+        self.session = ort.InferenceSession(onnx_path, sess_options=session_options, providers=providers)
+        self.providers = self.session.get_providers()
+
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        # Static exports carry the image size in the input shape; dynamic ones use 'height'/'width'
+        height, width = model_input.shape[2], model_input.shape[3]
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        if not isinstance(height, int) or not isinstance(width, int):
+            height, width = _parse_metadata(metadata.get('imgsz'), [640, 640])
+        self.input_size = (int(height), int(width))
+        self.fixed_batch = model_input.shape[0] if isinstance(model_input.shape[0], int) else None
+        self.names = {int(k): v for k, v in _parse_metadata(metadata.get('names'), {}).items()}
+
+    def __call__(self, images, verbose=False):
+        """Run detection on one image or a list of HWC uint8 BGR arrays (or PIL images)"""
+        if not isinstance(images, (list, tuple)):
+            images = [images]
+
+        batch = np.stack([self._letterbox(image) for image in images])
+        if self.fixed_batch == 1 and len(images) > 1:
+            outputs = np.concatenate([self.session.run(None, {self.input_name: batch[i:i + 1]})[0]
+                                      for i in range(len(images))])
+        else:
+            outputs = self.session.run(None, {self.input_name: batch})[0]
+
+        return [DetectionResult(self._postprocess(output), self.names) for output in outputs]
+
+    def _letterbox(self, image):
+        """Resize keeping aspect ratio and pad to the model input size; returns CHW float32 RGB in [0, 1]"""
+        if isinstance(image, Image.Image):
+            rgb_image = image.convert('RGB')
+        else:
+            rgb_image = Image.fromarray(np.ascontiguousarray(np.asarray(image)[:, :, ::-1]))
+
+        target_height, target_width = self.input_size
+        ratio = min(target_height / rgb_image.height, target_width / rgb_image.width)
+        new_width, new_height = round(rgb_image.width * ratio), round(rgb_image.height * ratio)
+        if (new_width, new_height) != rgb_image.size:
+            rgb_image = rgb_image.resize((new_width, new_height), Image.BILINEAR)
+
+        canvas = np.full((target_height, target_width, 3), LETTERBOX_PAD_VALUE, dtype=np.uint8)
+        top = (target_height - new_height) // 2
+        left = (target_width - new_width) // 2
+        canvas[top:top + new_height, left:left + new_width] = np.asarray(rgb_image)
+
+        return canvas.transpose(2, 0, 1).astype(np.float32) / 255.0
+
+    def _postprocess(self, output):
+        """Decode one (4 + classes, anchors) YOLOv8 output into confidence-filtered, NMS-ed boxes"""
+        predictions = output.T
+        class_scores = predictions[:, 4:]
+        cls = class_scores.argmax(axis=1)
+        conf = class_scores[np.arange(len(cls)), cls]
+
+        keep = conf > self.conf_threshold
+        predictions, cls, conf = predictions[keep], cls[keep], conf[keep]
+
+        xywh = predictions[:, :4]
+        xyxy = np.concatenate([xywh[:, :2] - xywh[:, 2:] / 2, xywh[:, :2] + xywh[:, 2:] / 2], axis=1)
+
+        keep = _non_max_suppression(xyxy, conf, cls, self.iou_threshold)[:self.max_detections]
+        return DetectionBoxes(xyxy[keep], conf[keep].astype(np.float32), cls[keep].astype(np.float32))
+
+
+def _parse_metadata(value, default):
+    if not value:
+        return default
+    try:
+        return ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        return default
+
+
+def _non_max_suppression(boxes, scores, classes, iou_threshold):
+    """Per-class NMS; returns kept indices sorted by score"""
+    if len(scores) == 0:
+        return np.array([], dtype=np.int64)
+
+    # Offset boxes by class so boxes of different classes never overlap
+    offset_boxes = boxes + classes[:, None].astype(boxes.dtype) * 4096
+    x1, y1, x2, y2 = offset_boxes.T
+    areas = (x2 - x1) * (y2 - y1)
+
+    order = scores.argsort()[::-1]
+    keep = []
+    while order.size > 0:
+        i = order[0]
+        keep.append(i)
+        xx1 = np.maximum(x1[i], x1[order[1:]])
+        yy1 = np.maximum(y1[i], y1[order[1:]])
+        xx2 = np.minimum(x2[i], x2[order[1:]])
+        yy2 = np.minimum(y2[i], y2[order[1:]])
+        intersection = np.clip(xx2 - xx1, 0, None) * np.clip(yy2 - yy1, 0, None)
+        iou = intersection / (areas[i] + areas[order[1:]] - intersection + 1e-9)
+        order = order[1:][iou <= iou_threshold]
+
+    return np.array(keep, dtype=np.int64)
+
+
+def load_onnx_model(onnx_path, backend='onnx'):
+    """Model registry loader for ONNX-served species"""
+    return OnnxYoloModel(onnx_path, backend=backend)
+
+
+def export_onnx(model_path, imgsz=640, int8=False):
+    """Export a YOLOv8 .pt model to ONNX (and optionally an INT8-quantized copy); returns the paths"""
+    from ultralytics import YOLO
+
+    onnx_path = YOLO(model_path).export(format='onnx', imgsz=imgsz, dynamic=True, simplify=True)
+    logger.info(f"✅ Exported {model_path} to {onnx_path}")
+    exported = {'onnx': onnx_path}
+
+    if int8:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        int8_path = os.path.splitext(onnx_path)[0] + '_int8.onnx'
+        quantize_dynamic(onnx_path, int8_path, weight_type=QuantType.QUInt8)
+        logger.info(f"✅ Quantized {onnx_path} to {int8_path}")
+        exported['int8'] = int8_path
+
+    return exported
+
+
+def check_parity(model_path, onnx_path, image_paths, backend='onnx', conf_tolerance=0.05):
+    """Compare top detections of the PyTorch model and its ONNX export on sample images"""
+    from ultralytics import YOLO
+    from detection_pipeline import extract_predictions
+    from image_preprocessing import prepare_for_inference
+
+    torch_model = YOLO(model_path)
+    onnx_model = OnnxYoloModel(onnx_path, backend=backend)
+
+    mismatches = []
+    for image_path in image_paths:
+        with open(image_path, 'rb') as image_file:
+            image = prepare_for_inference(image_file.read())
+
+        torch_predictions = extract_predictions(torch_model(image, verbose=False))
+        onnx_predictions = extract_predictions(onnx_model([image]))
+
+        torch_top = torch_predictions[0] if torch_predictions else None
+        onnx_top = onnx_predictions[0] if onnx_predictions else None
+        if torch_top is None and onnx_top is None:
+            continue
+        if (torch_top is None or onnx_top is None
+                or torch_top['class'] != onnx_top['class']
+                or abs(torch_top['confidence'] - onnx_top['confidence']) > conf_tolerance):
+            mismatches.append({'image': image_path, 'torch': torch_top, 'onnx': onnx_top})
+
+    report = {
+        'model_path': model_path,
+        'onnx_path': onnx_path,
+        'images': len(image_paths),
+        'mismatches': mismatches,
+        'passed': not mismatches
+    }
+    if mismatches:
+        logger.warning(f"⚠️  Parity check failed for {onnx_path}: {len(mismatches)}/{len(image_paths)} images differ")
+    else:
+        logger.info(f"✅ Parity check passed for {onnx_path} on {len(image_paths)} images")
+    return report
+
+
+def _list_images(directory):
+    return sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if name.rsplit('.', 1)[-1].lower() in ('png', 'jpg', 'jpeg', 'webp')
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export YOLOv8 detection models to ONNX and verify parity')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = subparsers.add_parser('export', help='Export a .pt model to ONNX')
+    export_parser.add_argument('model_path')
+    export_parser.add_argument('--imgsz', type=int, default=640)
+    export_parser.add_argument('--int8', action='store_true', help='Also write an INT8-quantized model')
+    export_parser.add_argument('--parity-images', help='Directory of sample images for a parity check')
+
+    parity_parser = subparsers.add_parser('parity', help='Compare a .pt model with its ONNX export')
+    parity_parser.add_argument('model_path')
+    parity_parser.add_argument('onnx_path')
+    parity_parser.add_argument('image_dir')
+    parity_parser.add_argument('--backend', default='onnx', choices=sorted(BACKEND_PROVIDERS))
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if args.command == 'export':
+        exported = export_onnx(args.model_path, imgsz=args.imgsz, int8=args.int8)
+        if args.parity_images:
+            images = _list_images(args.parity_images)
+            reports = [check_parity(args.model_path, path, images) for path in exported.values()]
+            print(json.dumps(reports, indent=2))
+            return 0 if all(report['passed'] for report in reports) else 1
+        print(json.dumps(exported, indent=2))
+        return 0
+
+    report = check_parity(args.model_path, args.onnx_path, _list_images(args.image_dir), backend=args.backend)
+    print(json.dumps(report, indent=2))
+    return 0 if report['passed'] else 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,219 @@
+import logging
+import math
+import multiprocessing
+import os
+import re
+import tempfile
+import threading
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+
+from response_cache import STOPWORDS
+from upload_streams import open_buffer
+
+logger = logging.getLogger(__name__)
+
+try:
+    import PyPDF2
+    PDF_AVAILABLE = True
+except ImportError:
+    PyPDF2 = None
+    PDF_AVAILABLE = False
+
+_WORD = re.compile(r'\w+', re.UNICODE)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def start_extraction_executor(max_workers):
+    """
+    Create the process pool for extracting large PDFs and fork its workers right away.
+    Call it while the process is still single-threaded (app import, or gunicorn's post_fork): a child
+    forked while other threads hold locks (logging, the MongoDB client, executors) can deadlock.
+    Returns the pool, or None when disabled or when threads are already running, in which case
+    PDFs are extracted in-process.
+    """
+    global _executor
+    with _executor_lock:
+        # A pool inherited through fork belongs to the parent process
+        _executor = None
+        if max_workers <= 0:
+            return None
+        if threading.active_count() > 1:
+            logger.warning("⚠️  PDF extraction pool not started: threads are already running, extracting in-process")
+            return None
+        executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('fork'))
+        # The first submit forks every worker, before the pool starts its own manager thread
+        executor.submit(os.getpid).result()
+        _executor = executor
+        return executor
+
+
+def get_extraction_executor():
+    """Process pool started by start_extraction_executor, or None"""
+    return _executor
+
+
+# Suffixes folded so 'treat', 'treated' and 'treatment' match (longest first)
+_SUFFIXES = ('ations', 'ation', 'ating', 'ated', 'ates', 'ate', 'ments', 'ment', 'ings', 'ing', 'ed', 's')
+
+
+def _stem(word):
+    for suffix in _SUFFIXES:
+        min_stem = 3 if suffix == 's' else 4
+        if word.endswith(suffix) and len(word) - len(suffix) >= min_stem and not word.endswith('ss'):
+            return word[:-len(suffix)]
+    return word
+
+
+def tokenize(text):
+    """Lowercased, lightly stemmed word tokens without stopwords"""
+    return [_stem(word) for word in _WORD.findall(text.lower()) if word not in STOPWORDS and len(word) > 1]
+
+
+def _extract_pages(path, page_numbers):
+    """Extract a range of pages (runs in a worker process)"""
+    with open(path, 'rb') as f:
+        reader = PyPDF2.PdfReader(f)
+        return [(number, reader.pages[number].extract_text() or '') for number in page_numbers]
+
+
+def iter_page_texts(pdf_bytes, max_pages=None, executor=None, min_parallel_pages=16, batch_pages=8, window=8):
+    """
+    Yield (page_number, text) in page order, extracting lazily.
+    Documents with at least min_parallel_pages pages are extracted on the process pool in batches,
+    keeping at most `window` batches in flight; batches not yet consumed are cancelled when the caller stops.
+    """
+    reader = PyPDF2.PdfReader(open_buffer(pdf_bytes))
+    page_count = len(reader.pages) if max_pages is None else min(len(reader.pages), max_pages)
+
+    if executor is None or page_count < min_parallel_pages:
+        for number in range(page_count):
+            yield number, reader.pages[number].extract_text() or ''
+        return
+
+    # Workers read the document from a temp file instead of receiving the bytes with every batch
+    fd, path = tempfile.mkstemp(suffix='.pdf')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(pdf_bytes)
+
+    batches = iter([range(start, min(start + batch_pages, page_count)) for start in range(0, page_count, batch_pages)])
+    in_flight = deque()
+    try:
+        for batch in batches:
+            in_flight.append(executor.submit(_extract_pages, path, batch))
+            if len(in_flight) >= window:
+                break
+        while in_flight:
+            for page in in_flight.popleft().result():
+                yield page
+            next_batch = next(batches, None)
+            if next_batch is not None:
+                in_flight.append(executor.submit(_extract_pages, path, next_batch))
+    finally:
+        for future in in_flight:
+            future.cancel()
+        # Running batches keep their open handle; unlinking is still safe on POSIX
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+
+def split_passages(page_number, text, passage_chars=800):
+    """Split a page into passages of roughly passage_chars, breaking on whitespace"""
+    words = text.split()
+    passages = []
+    current = []
+    length = 0
+    for word in words:
+        if current and length + len(word) + 1 > passage_chars:
+            passages.append({'page': page_number, 'text': ' '.join(current)})
+            current, length = [], 0
+        current.append(word)
+        length += len(word) + 1
+    if current:
+        passages.append({'page': page_number, 'text': ' '.join(current)})
+    return passages
+
+
+def rank_passages(passages, query_terms, k1=1.5, b=0.75):
+    """BM25 score for every passage against the query terms"""
+    if not passages or not query_terms:
+        return [0.0] * len(passages)
+
+    term_counts = [Counter(passage['tokens']) for passage in passages]
+    average_length = sum(len(passage['tokens']) for passage in passages) / len(passages) or 1.0
+    document_frequency = Counter(term for counts in term_counts for term in set(counts) if term in query_terms)
+
+    scores = []
+    for passage, counts in zip(passages, term_counts):
+        length_norm = k1 * (1 - b + b * len(passage['tokens']) / average_length)
+        score = 0.0
+        for term in query_terms:
+            tf = counts.get(term, 0)
+            if tf:
+                idf = math.log(1 + (len(passages) - document_frequency[term] + 0.5) / (document_frequency[term] + 0.5))
+                score += idf * tf * (k1 + 1) / (tf + length_norm)
+        scores.append(score)
+    return scores
+
+
+def extract_relevant_text(pdf_bytes, question=None, context_chars=6000, max_pages=500, executor=None,
+                          min_parallel_pages=16):
+    """
+    Passages of a PDF most relevant to the question, labelled with their page numbers.
+    Pages are read lazily: without a question extraction stops once the context budget is filled;
+    with one it stops once enough passages matching most of the question terms have been found.
+    """
+    query_terms = set(tokenize(question)) if question else set()
+    required_matches = max(1, math.ceil(0.6 * len(query_terms)))
+
+    passages = []
+    strong_chars = 0
+    page_count = 0
+    stopped_early = False
+    pages = iter_page_texts(pdf_bytes, max_pages=max_pages, executor=executor, min_parallel_pages=min_parallel_pages)
+    try:
+        for page_number, text in pages:
+            page_count += 1
+            for passage in split_passages(page_number + 1, text):
+                passage['tokens'] = tokenize(passage['text'])
+                passage['position'] = len(passages)
+                passages.append(passage)
+                if not query_terms or len(query_terms.intersection(passage['tokens'])) >= required_matches:
+                    strong_chars += len(passage['text'])
+            if strong_chars >= context_chars:
+                stopped_early = True
+                break
+    finally:
+        pages.close()
+
+    if not passages:
+        return {'text': '', 'pages_read': page_count, 'passages_used': 0, 'stopped_early': stopped_early}
+
+    # Most relevant passages first; without a question (or without any match) keep document order
+    scores = rank_passages(passages, query_terms)
+    if any(scores):
+        ranked = sorted((passage for passage in passages if scores[passage['position']] > 0),
+                        key=lambda passage: (-scores[passage['position']], passage['position']))
+    else:
+        ranked = passages
+
+    selected = []
+    used_chars = 0
+    for passage in ranked:
+        if used_chars + len(passage['text']) > context_chars and selected:
+            break
+        selected.append(passage)
+        used_chars += len(passage['text'])
+
+    selected.sort(key=lambda passage: passage['position'])
+    context = '\n\n'.join(f"[Page {passage['page']}] {passage['text'][:context_chars]}" for passage in selected)
+    return {
+        'text': context,
+        'pages_read': page_count,
+        'passages_used': len(selected),
+        'stopped_early': stopped_early
+    }
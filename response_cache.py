@@ -0,0 +1,188 @@
+import re
+import threading
+from collections import Counter
+
+from result_cache import create_result_cache
+
+# Words that carry no meaning for matching questions against each other
+STOPWORDS = {
+    'a', 'an', 'the', 'is', 'are', 'was', 'were', 'be', 'to', 'of', 'in', 'on', 'for', 'with', 'and',
+    'or', 'my', 'our', 'your', 'its', 'it', 'this', 'that', 'what', 'which', 'how', 'do', 'does', 'can',
+    'i', 'we', 'you', 'me', 'please', 'tell', 'about', 'should', 'there', 'any', 'some'
+}
+
+_NON_WORD = re.compile(r'[^\w\s]+', re.UNICODE)
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_query(text):
+    """Lowercase, strip punctuation and collapse whitespace so trivially different questions match"""
+    return _WHITESPACE.sub(' ', _NON_WORD.sub(' ', text.lower())).strip()
+
+
+def _content_words(normalized):
+    """Words that carry the meaning of a question, with simple plurals folded ('cows' -> 'cow')"""
+    words = []
+    for word in normalized.split():
+        if word in STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+            word = word[:-1]
+        words.append(word)
+    return words
+
+
+def _trigrams(text):
+    padded = f' {text} '
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def _jaccard(a, b):
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class ChatResponseCache:
+    """
+    Response cache for chatbot questions with two tiers:
+    an exact tier keyed on normalized text and language, and an optional similarity tier that
+    serves near-duplicate questions (character-trigram similarity plus content-word overlap).
+    """
+
+    def __init__(self, max_entries=5000, ttl_seconds=21600, similarity_threshold=0.8,
+                 word_threshold=0.75, shared_url=None):
+        """
+        similarity_threshold: minimum trigram Jaccard similarity for a near-duplicate hit (0 disables the tier)
+        word_threshold: minimum overlap of content words, so 'mastitis in cows' does not answer 'mastitis in goats'
+        """
+        self.similarity_threshold = similarity_threshold
+        self.word_threshold = word_threshold
+
+        # Entry lifetime and eviction are handled by the exact tier; the index follows its evictions
+        self._responses = create_result_cache('chat', max_entries, ttl_seconds, shared_url, on_evict=self._unindex)
+
+        self._index_lock = threading.Lock()
+        self._postings = {}
+        self._features = {}
+
+        self._stats_lock = threading.Lock()
+        self._exact_hits = 0
+        self._similar_hits = 0
+        self._misses = 0
+
+    @staticmethod
+    def _key(language, normalized):
+        return f'{language}:{normalized}'
+
+    def get(self, query, language):
+        """Cached response for the question, or None"""
+        normalized = normalize_query(query)
+        if not normalized:
+            return None
+
+        response = self._responses.get(self._key(language, normalized))
+        if response is not None:
+            self._count('exact')
+            return response
+
+        if self.similarity_threshold > 0:
+            similar_key = self._find_similar(language, normalized)
+            if similar_key is not None:
+                response = self._responses.get(similar_key)
+                if response is not None:
+                    self._count('similar')
+                    return response
+
+        self._count('miss')
+        return None
+
+    def set(self, query, language, response):
+        """Cache a successful response for the question"""
+        normalized = normalize_query(query)
+        if not normalized:
+            return
+
+        key = self._key(language, normalized)
+        if self.similarity_threshold > 0:
+            self._index(key, language, normalized)
+        self._responses.set(key, response)
+
+    @staticmethod
+    def _similarity_features(normalized):
+        """Trigrams and word set of the content words, so stopword rephrasing does not lower similarity"""
+        words = _content_words(normalized) or normalized.split()
+        return _trigrams(' '.join(words)), frozenset(words)
+
+    def _index(self, key, language, normalized):
+        features = self._similarity_features(normalized)
+        with self._index_lock:
+            if key in self._features:
+                return
+            self._features[key] = features
+            trigrams = features[0]
+            postings = self._postings.setdefault(language, {})
+            for trigram in trigrams:
+                postings.setdefault(trigram, set()).add(key)
+
+    def _unindex(self, key):
+        with self._index_lock:
+            features = self._features.pop(key, None)
+            if features is None:
+                return
+            postings = self._postings.get(key.split(':', 1)[0], {})
+            for trigram in features[0]:
+                keys = postings.get(trigram)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del postings[trigram]
+
+    def _find_similar(self, language, normalized, max_candidates=20):
+        """Best indexed question above both thresholds, found through the trigram inverted index"""
+        trigrams, words = self._similarity_features(normalized)
+
+        # Never call into the exact tier while holding the index lock (its evictions take this lock)
+        with self._index_lock:
+            postings = self._postings.get(language)
+            if not postings:
+                return None
+
+            shared_counts = Counter()
+            for trigram in trigrams:
+                shared_counts.update(postings.get(trigram, ()))
+
+            best_key, best_score = None, 0.0
+            for key, _ in shared_counts.most_common(max_candidates):
+                candidate_trigrams, candidate_words = self._features[key]
+                score = _jaccard(trigrams, candidate_trigrams)
+                if (score >= self.similarity_threshold and score > best_score
+                        and _jaccard(words, candidate_words) >= self.word_threshold):
+                    best_key, best_score = key, score
+
+        return best_key
+
+    def _count(self, outcome):
+        with self._stats_lock:
+            if outcome == 'exact':
+                self._exact_hits += 1
+            elif outcome == 'similar':
+                self._similar_hits += 1
+            else:
+                self._misses += 1
+
+    def get_stats(self):
+        """Exact and near-duplicate hit rates"""
+        with self._stats_lock:
+            lookups = self._exact_hits + self._similar_hits + self._misses
+            stats = {
+                'exact_hits': self._exact_hits,
+                'similar_hits': self._similar_hits,
+                'misses': self._misses,
+                'hit_rate': round((self._exact_hits + self._similar_hits) / lookups, 4) if lookups else 0.0,
+                'similarity_threshold': self.similarity_threshold
+            }
+        with self._index_lock:
+            stats['indexed_questions'] = len(self._features)
+        stats['entries'] = self._responses.get_stats()['entries']
+        return stats
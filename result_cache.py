@@ -0,0 +1,151 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Optional shared backend so cached results are reused across workers and hosts
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    redis = None
+    REDIS_AVAILABLE = False
+
+
+def content_hash(data):
+    """Stable hash of raw upload bytes (or any bytes-like object)"""
+    return hashlib.blake2b(data, digest_size=20).hexdigest()
+
+
+def make_cache_key(namespace, data, *parts):
+    """Cache key from a namespace, the hash of the raw bytes and any extra identity parts"""
+    return ':'.join([namespace, content_hash(data)] + [str(part) for part in parts])
+
+
+class RedisCacheBackend:
+    """Shared cache tier stored in Redis as JSON values with a TTL"""
+
+    def __init__(self, url, ttl_seconds, prefix='gorakshaai:cache:'):
+        if not REDIS_AVAILABLE:
+            raise RuntimeError('redis package is not installed')
+        self.client = redis.Redis.from_url(url, socket_timeout=0.2, socket_connect_timeout=0.2)
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        return json.loads(value) if value is not None else None
+
+    def set(self, key, value):
+        self.client.set(self.prefix + key, json.dumps(value), ex=int(self.ttl_seconds))
+
+
+class ResultCache:
+    """Size-bounded LRU cache with TTL, optionally backed by a shared cache tier"""
+
+    def __init__(self, max_entries=1024, ttl_seconds=3600, shared_backend=None, name='results', on_evict=None):
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_seconds = float(ttl_seconds)
+        self.shared_backend = shared_backend
+        self.name = name
+        # Called with the key whenever an entry leaves the local tier (expiry or LRU eviction)
+        self.on_evict = on_evict
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._hits = 0
+        self._shared_hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key):
+        """Cached value for key, or None on a miss"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return value
+                del self._entries[key]
+                self._notify_evicted(key)
+
+        if self.shared_backend is not None:
+            try:
+                value = self.shared_backend.get(key)
+            except Exception as e:
+                logger.warning(f"⚠️  Shared cache lookup failed ({self.name}): {e}")
+                value = None
+            if value is not None:
+                self._store_local(key, value)
+                with self._lock:
+                    self._shared_hits += 1
+                return value
+
+        with self._lock:
+            self._misses += 1
+        return None
+
+    def set(self, key, value):
+        """Store a JSON-serializable value"""
+        self._store_local(key, value)
+        if self.shared_backend is not None:
+            try:
+                self.shared_backend.set(key, value)
+            except Exception as e:
+                logger.warning(f"⚠️  Shared cache store failed ({self.name}): {e}")
+
+    def _store_local(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                evicted_key, _ = self._entries.popitem(last=False)
+                self._evictions += 1
+                self._notify_evicted(evicted_key)
+
+    def _notify_evicted(self, key):
+        if self.on_evict is not None:
+            self.on_evict(key)
+
+    def clear(self):
+        with self._lock:
+            for key in self._entries:
+                self._notify_evicted(key)
+            self._entries.clear()
+
+    def get_stats(self):
+        """Hit rate and size of the cache"""
+        with self._lock:
+            lookups = self._hits + self._shared_hits + self._misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'shared_backend': self.shared_backend is not None,
+                'hits': self._hits,
+                'shared_hits': self._shared_hits,
+                'misses': self._misses,
+                'evictions': self._evictions,
+                'hit_rate': round((self._hits + self._shared_hits) / lookups, 4) if lookups else 0.0
+            }
+
+
+def create_result_cache(name, max_entries, ttl_seconds, shared_url=None, on_evict=None):
+    """Build a ResultCache, attaching the Redis tier when a URL is configured and redis is installed"""
+    shared_backend = None
+    if shared_url:
+        try:
+            shared_backend = RedisCacheBackend(shared_url, ttl_seconds, prefix=f'gorakshaai:{name}:')
+            logger.info(f"✅ Shared cache backend enabled for {name}")
+        except Exception as e:
+            logger.warning(f"⚠️  Shared cache backend unavailable for {name}, using in-process cache only: {e}")
+    return ResultCache(max_entries=max_entries, ttl_seconds=ttl_seconds, shared_backend=shared_backend,
+                       name=name, on_evict=on_evict)
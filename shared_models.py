@@ -0,0 +1,130 @@
+import gc
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Private_Dirty of this worker right after it was forked from the preloading master
+_fork_baseline = None
+
+
+def preload_models(registry):
+    """
+    Load every available model in the current (master) process so forked workers share the weights.
+    Models are put into their final inference state here, because anything that rewrites weights
+    after the fork (layer fusing, eval switching) would give every worker its own copy of the pages.
+    """
+    loaded = registry.preload()
+    for species in loaded:
+        prepare_for_sharing(registry.peek(species))
+
+    # Move everything allocated so far out of the GC generations so collections in the
+    # workers don't write to (and therefore copy) pages holding the preloaded objects
+    gc.collect()
+    gc.freeze()
+    logger.info(f"✅ Preloaded {len(loaded)} detection model(s) for sharing with workers: {', '.join(loaded) or 'none'}")
+    return loaded
+
+
+def prepare_for_sharing(model):
+    """Fuse and freeze a YOLO model so inference never writes to its weight tensors"""
+    fuse = getattr(model, 'fuse', None)
+    if callable(fuse):
+        fuse()
+
+    torch_model = getattr(model, 'model', None)
+    if torch_model is not None and hasattr(torch_model, 'parameters'):
+        torch_model.eval()
+        for parameter in torch_model.parameters():
+            parameter.requires_grad_(False)
+
+
+def weight_bytes(model):
+    """Total size of a YOLO model's parameters and buffers in bytes (0 if not a torch model)"""
+    torch_model = getattr(model, 'model', None)
+    if torch_model is None or not hasattr(torch_model, 'parameters'):
+        return 0
+    tensors = list(torch_model.parameters()) + list(torch_model.buffers())
+    return sum(tensor.numel() * tensor.element_size() for tensor in tensors)
+
+
+def read_memory_usage():
+    """Shared/private memory breakdown of this process in KB from /proc/self/smaps_rollup (Linux only)"""
+    usage = {}
+    try:
+        with open('/proc/self/smaps_rollup') as smaps:
+            for line in smaps:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == 'kB':
+                    usage[parts[0].rstrip(':')] = int(parts[1])
+    except OSError:
+        return None
+
+    return {
+        'rss_kb': usage.get('Rss', 0),
+        'pss_kb': usage.get('Pss', 0),
+        'shared_kb': usage.get('Shared_Clean', 0) + usage.get('Shared_Dirty', 0),
+        'private_kb': usage.get('Private_Clean', 0) + usage.get('Private_Dirty', 0),
+        'private_dirty_kb': usage.get('Private_Dirty', 0)
+    }
+
+
+def record_fork_baseline():
+    """Remember this worker's private memory right after fork (call from the Gunicorn post_fork hook)"""
+    global _fork_baseline
+    usage = read_memory_usage()
+    _fork_baseline = usage['private_dirty_kb'] if usage else None
+
+
+def get_sharing_report(registry):
+    """Memory report for this worker, including private memory growth since it was forked"""
+    usage = read_memory_usage()
+    report = {
+        'pid': os.getpid(),
+        'memory': usage,
+        'fork_baseline_private_dirty_kb': _fork_baseline,
+        'private_dirty_growth_since_fork_kb': None,
+        'model_weight_kb': {
+            species: weight_bytes(registry.peek(species)) // 1024 for species in registry.warm_models()
+        }
+    }
+    if usage and _fork_baseline is not None:
+        report['private_dirty_growth_since_fork_kb'] = usage['private_dirty_kb'] - _fork_baseline
+    return report
+
+
+def check_inference_page_copies(registry, species, image=None):
+    """
+    Run one inference and measure how much private memory it dirtied in this worker.
+    If the growth approaches the size of the model weights, inference is copying the shared pages.
+    """
+    model = registry.get(species)
+    if model is None:
+        return None
+
+    if image is None:
+        import numpy as np
+        image = np.zeros((640, 640, 3), dtype=np.uint8)
+
+    before = read_memory_usage()
+    model(image, verbose=False)
+    after = read_memory_usage()
+    if before is None or after is None:
+        return None
+
+    growth_kb = after['private_dirty_kb'] - before['private_dirty_kb']
+    weights_kb = weight_bytes(model) // 1024
+    copied = weights_kb > 0 and growth_kb >= weights_kb // 2
+
+    if copied:
+        logger.warning(f"⚠️  Inference on {species} model dirtied {growth_kb} KB "
+                       f"(weights {weights_kb} KB) - shared weight pages are being copied")
+    else:
+        logger.info(f"✅ Inference on {species} model dirtied {growth_kb} KB (weights {weights_kb} KB) - weights remain shared")
+
+    return {
+        'species': species,
+        'private_dirty_growth_kb': growth_kb,
+        'weight_kb': weights_kb,
+        'weights_copied': copied
+    }
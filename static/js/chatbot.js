@@ -849,7 +849,7 @@ class VeterinaryChatbot {
         this.showTypingIndicator();
 
         try {
-            const response = await fetch('/api/chat', {
+            const response = await fetch('/api/chat/stream', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
@@ -860,14 +860,25 @@ class VeterinaryChatbot {
                 })
             });
 
-            const data = await response.json();
+            // Errors before streaming starts (unavailable, busy, bad input) come back as JSON
+            const contentType = response.headers.get('Content-Type') || '';
+            const data = contentType.includes('text/event-stream')
+                ? await this.readChatStream(response)
+                : await response.json();
             
             if (data.success) {
                 this.hideTypingIndicator();
-                this.addMessage('bot', data.response);
+                if (this.streamingMessage) {
+                    this.streamingMessage.querySelector('.message-text').innerHTML = this.formatMessage(data.response);
+                } else {
+                    this.addMessage('bot', data.response);
+                }
                 this.speak(data.response);
             } else {
                 this.hideTypingIndicator();
+                if (this.streamingMessage) {
+                    this.streamingMessage.remove();
+                }
                 // Handle improved error responses
                 if (data.fallback_response) {
                     this.addMessage('bot', data.fallback_response);
@@ -880,6 +891,7 @@ class VeterinaryChatbot {
                 this.showToast(data.error || 'Service temporarily unavailable', 'error');
                 console.error('Chat error:', data.error);
             }
+            this.streamingMessage = null;
         } catch (error) {
             console.error('Error sending message:', error);
             this.hideTypingIndicator();
@@ -895,6 +907,53 @@ class VeterinaryChatbot {
         // Removed the finally block with hideLoading() since we removed showLoading()
     }
 
+    async readChatStream(response) {
+        // Parse Server-Sent Events from /api/chat/stream, rendering tokens as they arrive
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let text = '';
+        this.streamingMessage = null;
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const rawEvent = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+
+                let eventName = 'message';
+                let eventData = '';
+                rawEvent.split('\n').forEach(line => {
+                    if (line.startsWith('event: ')) eventName = line.slice(7);
+                    else if (line.startsWith('data: ')) eventData += line.slice(6);
+                });
+                if (!eventData) continue;
+
+                const payload = JSON.parse(eventData);
+                if (eventName === 'token') {
+                    text += payload.text;
+                    if (!this.streamingMessage) {
+                        this.hideTypingIndicator();
+                        this.streamingMessage = this.addMessage('bot', text);
+                    } else {
+                        this.streamingMessage.querySelector('.message-text').innerHTML = this.formatMessage(text);
+                        if (this.settings.autoScrollEnabled) {
+                            this.scrollToBottom();
+                        }
+                    }
+                } else if (eventName === 'done') {
+                    return payload;
+                }
+            }
+        }
+
+        return { success: false, error: 'Response stream ended unexpectedly' };
+    }
+
     addMessage(sender, text) {
         const messagesContainer = document.getElementById('chatMessages');
         const messageDiv = document.createElement('div');
@@ -917,6 +976,8 @@ class VeterinaryChatbot {
         if (this.settings.autoScrollEnabled) {
             this.scrollToBottom();
         }
+        
+        return messageDiv;
     }
 
     formatMessage(text) {
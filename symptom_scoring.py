@@ -0,0 +1,443 @@
+"""
+Symptom-based disease scoring compiled from the disease knowledge base file.
+
+    python symptom_scoring.py validate data/disease_knowledge_base.json
+    python symptom_scoring.py benchmark --species 20 --diseases 40 --symptoms 300
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import statistics
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_KNOWLEDGE_BASE_PATH = 'data/disease_knowledge_base.json'
+
+_SYMPTOM_NAME = re.compile(r'^[a-z0-9_]+$')
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _validate_species(label, entry, problems):
+    """Problems in one species entry: {'diseases': [...], 'symptoms': {symptom: [disease or {disease, weight}]}}"""
+    if not isinstance(entry, dict):
+        problems.append(f"{label}: expected an object")
+        return set()
+    diseases = entry.get('diseases')
+    if not isinstance(diseases, list) or not diseases or not all(isinstance(name, str) and name for name in diseases):
+        problems.append(f"{label}.diseases: expected a non-empty list of names")
+        return set()
+    if len(set(diseases)) != len(diseases):
+        problems.append(f"{label}.diseases: duplicate disease names")
+
+    symptoms = entry.get('symptoms', {})
+    if not isinstance(symptoms, dict):
+        problems.append(f"{label}.symptoms: expected an object")
+        return set(diseases)
+    for symptom, links in symptoms.items():
+        if not _SYMPTOM_NAME.match(symptom):
+            problems.append(f"{label}.symptoms: '{symptom}' is not a lowercase_snake_case symptom id")
+        if not isinstance(links, list):
+            problems.append(f"{label}.symptoms.{symptom}: expected a list")
+            continue
+        for link in links:
+            name = link.get('disease') if isinstance(link, dict) else link
+            if name not in diseases:
+                problems.append(f"{label}.symptoms.{symptom}: unknown disease {name!r}")
+            if isinstance(link, dict) and not (_is_number(link.get('weight')) and link['weight'] > 0):
+                problems.append(f"{label}.symptoms.{symptom}: weight for {name!r} must be a positive number")
+    return set(diseases)
+
+
+def validate_knowledge_base(knowledge_base):
+    """Every problem found in a knowledge base document (an empty list means it is valid)"""
+    if not isinstance(knowledge_base, dict):
+        return ["knowledge base: expected an object"]
+    problems = []
+    if not isinstance(knowledge_base.get('version'), str) or not knowledge_base['version']:
+        problems.append("version: expected a non-empty string")
+
+    scoring = knowledge_base.get('scoring')
+    if not isinstance(scoring, dict):
+        problems.append("scoring: expected an object")
+    else:
+        for key in ('base_score', 'symptom_weight', 'confidence_scale', 'min_confidence', 'max_confidence'):
+            if not _is_number(scoring.get(key)):
+                problems.append(f"scoring.{key}: expected a number")
+        if _is_number(scoring.get('min_confidence')) and _is_number(scoring.get('max_confidence')) \
+                and scoring['min_confidence'] > scoring['max_confidence']:
+            problems.append("scoring: min_confidence is above max_confidence")
+
+    species = knowledge_base.get('species')
+    known_diseases = set()
+    if not isinstance(species, dict) or not species:
+        problems.append("species: expected a non-empty object")
+    else:
+        for name, entry in species.items():
+            known_diseases |= _validate_species(f"species.{name}", entry, problems)
+    known_diseases |= _validate_species('fallback', knowledge_base.get('fallback'), problems)
+
+    contagious = knowledge_base.get('contagious_diseases', [])
+    if not isinstance(contagious, list):
+        problems.append("contagious_diseases: expected a list")
+    else:
+        for name in contagious:
+            if not isinstance(name, str):
+                problems.append(f"contagious_diseases: expected disease names, got {name!r}")
+            elif name not in known_diseases:
+                problems.append(f"contagious_diseases: unknown disease {name!r}")
+
+    recommendations = knowledge_base.get('recommendations', {})
+    if not isinstance(recommendations, dict):
+        problems.append("recommendations: expected an object")
+        return problems
+    general = recommendations.get('general')
+    if not isinstance(general, list) or not all(isinstance(text, str) for text in general):
+        problems.append("recommendations.general: expected a list of strings")
+    rules = recommendations.get('symptom_rules', [])
+    if not isinstance(rules, list):
+        problems.append("recommendations.symptom_rules: expected a list")
+        rules = []
+    for position, rule in enumerate(rules):
+        if not isinstance(rule, dict) or not isinstance(rule.get('symptoms'), list) or not rule['symptoms'] \
+                or not all(isinstance(symptom, str) for symptom in rule['symptoms']) \
+                or not isinstance(rule.get('text'), str):
+            problems.append(f"recommendations.symptom_rules[{position}]: expected {{'symptoms': ['...'], 'text': '...'}}")
+    if not isinstance(recommendations.get('contagious', ''), str):
+        problems.append("recommendations.contagious: expected a string")
+    return problems
+
+
+def _plain_score(score):
+    """NumPy score as a JSON-friendly int (weights are usually whole numbers) or float"""
+    score = float(score)
+    return int(score) if score.is_integer() else score
+
+
+class SymptomScoringEngine:
+    """
+    Disease scoring compiled once from a validated knowledge base.
+
+    Every species gets a symptom x disease weight matrix (stacked into one species x symptom x disease
+    array, padded to the largest disease list). Its rows are the inverted symptom -> disease index: a case
+    is scored by summing the rows of its symptoms, and a batch of cases for a species is one matrix product.
+    Recommendation rules are indexed by symptom the same way.
+    """
+
+    def __init__(self, knowledge_base, content_hash=None):
+        problems = validate_knowledge_base(knowledge_base)
+        if problems:
+            raise ValueError(f"Invalid disease knowledge base ({len(problems)} problem(s)): " + '; '.join(problems[:10]))
+
+        scoring = knowledge_base['scoring']
+        self.min_confidence = scoring['min_confidence']
+        self.max_confidence = scoring['max_confidence']
+        self.confidence_scale = scoring['confidence_scale']
+
+        species_data = dict(knowledge_base['species'])
+        species_data[None] = knowledge_base['fallback']
+
+        self.symptoms = sorted({symptom for data in species_data.values() for symptom in data.get('symptoms', {})})
+        self.symptom_index = {symptom: i for i, symptom in enumerate(self.symptoms)}
+        self.species = list(species_data)
+        self.species_index = {species: i for i, species in enumerate(self.species)}
+        self.diseases = [list(data['diseases']) for data in species_data.values()]
+
+        max_diseases = max(len(diseases) for diseases in self.diseases)
+        # Padding columns never win the ranking
+        self.base_scores = np.full((len(self.species), max_diseases), -np.inf, dtype=np.float32)
+        links = []
+        for s, data in enumerate(species_data.values()):
+            disease_index = {disease: d for d, disease in enumerate(data['diseases'])}
+            self.base_scores[s, :len(data['diseases'])] = scoring['base_score']
+            for symptom, diseases in data.get('symptoms', {}).items():
+                for link in diseases:
+                    if isinstance(link, dict):
+                        name, weight = link['disease'], link['weight']
+                    else:
+                        name, weight = link, scoring['symptom_weight']
+                    links.append((s, self.symptom_index[symptom], disease_index[name], weight))
+
+        self.weights = np.zeros((len(self.species), len(self.symptoms), max_diseases), dtype=np.float32)
+        if links:
+            s, symptom, disease, weight = (np.array(column) for column in zip(*links))
+            np.add.at(self.weights, (s, symptom, disease), weight.astype(np.float32))
+
+        recommendations = knowledge_base['recommendations']
+        self.general_recommendations = list(recommendations['general'])
+        self.contagious_recommendation = recommendations.get('contagious')
+        self.contagious_diseases = set(knowledge_base.get('contagious_diseases', []))
+        self.rules = [rule['text'] for rule in recommendations.get('symptom_rules', [])]
+        self.rule_index = {}
+        for position, rule in enumerate(recommendations.get('symptom_rules', [])):
+            for symptom in rule['symptoms']:
+                self.rule_index.setdefault(symptom, []).append(position)
+
+        if content_hash is None:
+            content_hash = hashlib.sha256(json.dumps(knowledge_base, sort_keys=True).encode()).hexdigest()
+        self.version = f"{knowledge_base['version']}-{content_hash[:8]}"
+
+    @classmethod
+    def from_file(cls, path=DEFAULT_KNOWLEDGE_BASE_PATH):
+        with open(path, 'rb') as f:
+            data = f.read()
+        return cls(json.loads(data), content_hash=hashlib.sha256(data).hexdigest())
+
+    def _species_id(self, animal_type):
+        return self.species_index.get(animal_type, self.species_index[None])
+
+    def _symptom_ids(self, symptoms):
+        return sorted({self.symptom_index[symptom] for symptom in symptoms if symptom in self.symptom_index})
+
+    def _confidence(self, score):
+        return min(self.max_confidence, max(self.min_confidence, score * self.confidence_scale))
+
+    def score(self, animal_type, symptoms):
+        """Score of every disease of the species, in knowledge base order"""
+        s = self._species_id(animal_type)
+        scores = self.base_scores[s] + self.weights[s, self._symptom_ids(symptoms)].sum(axis=0)
+        return scores[:len(self.diseases[s])]
+
+    def predict(self, animal_type, symptoms, top_k=3):
+        """Prediction for one case"""
+        s = self._species_id(animal_type)
+        scores = self.score(animal_type, symptoms)
+        # Stable sort keeps knowledge base order between diseases with equal scores
+        ranking = np.argsort(-scores, kind='stable')[:top_k]
+        return self._build_prediction(animal_type, symptoms, [(self.diseases[s][d], _plain_score(scores[d])) for d in ranking])
+
+    def predict_batch(self, cases, top_k=3):
+        """
+        Predictions for many (animal_type, symptoms) cases, in input order.
+        Cases are grouped by species and each group is scored with a single matrix product.
+        """
+        groups = {}
+        for position, (animal_type, symptoms) in enumerate(cases):
+            groups.setdefault(self._species_id(animal_type), []).append(position)
+
+        results = [None] * len(cases)
+        for s, positions in groups.items():
+            rows, columns = [], []
+            for row, position in enumerate(positions):
+                for symptom_id in self._symptom_ids(cases[position][1]):
+                    rows.append(row)
+                    columns.append(symptom_id)
+            matrix = np.zeros((len(positions), len(self.symptoms)), dtype=np.float32)
+            matrix[rows, columns] = 1.0
+            scores = matrix @ self.weights[s] + self.base_scores[s]
+            ranking = np.argsort(-scores, axis=1, kind='stable')[:, :top_k]
+
+            for row, position in enumerate(positions):
+                animal_type, symptoms = cases[position]
+                ranked = [(self.diseases[s][d], _plain_score(scores[row, d])) for d in ranking[row] if d < len(self.diseases[s])]
+                results[position] = self._build_prediction(animal_type, symptoms, ranked)
+        return results
+
+    def recommendations(self, symptoms, top_disease):
+        """General advice, then the rules fired by the symptoms (in table order)"""
+        recommendations = list(self.general_recommendations)
+        fired = sorted({position for symptom in symptoms for position in self.rule_index.get(symptom, ())})
+        recommendations.extend(self.rules[position] for position in fired)
+        if top_disease in self.contagious_diseases and self.contagious_recommendation:
+            recommendations.insert(1, self.contagious_recommendation)
+        return recommendations
+
+    def _build_prediction(self, animal_type, symptoms, ranked):
+        top_disease = ranked[0][0] if ranked else 'Unknown Condition'
+        confidence = self._confidence(ranked[0][1]) if ranked else 70
+
+        return {
+            'disease': top_disease,
+            'confidence': round(confidence, 1),
+            'symptoms_analyzed': symptoms,
+            'recommendations': self.recommendations(symptoms, top_disease),
+            'severity': 'High' if confidence > 80 else 'Medium' if confidence > 60 else 'Low',
+            'animal_type': animal_type,
+            'differential': [
+                {'disease': disease, 'confidence': round(self._confidence(score), 1)}
+                for disease, score in ranked
+            ],
+            'knowledge_base_version': self.version
+        }
+
+    def get_stats(self):
+        return {
+            'version': self.version,
+            'species': len(self.species) - 1,
+            'diseases': sum(len(diseases) for diseases in self.diseases),
+            'symptoms': len(self.symptoms),
+            'recommendation_rules': len(self.rules)
+        }
+
+
+class ScoringEngineStore:
+    """
+    The scoring engine for the knowledge base file, recompiled when the file changes.
+    The file's mtime is checked at most every refresh_seconds on access. A new engine replaces the old
+    one in a single reference swap, so in-flight requests finish on the engine they started with; an
+    invalid file is logged and the previous engine stays in service.
+    """
+
+    def __init__(self, path=DEFAULT_KNOWLEDGE_BASE_PATH, refresh_seconds=5.0):
+        self.path = path
+        self.refresh_seconds = refresh_seconds
+        self._engine = None
+        self._mtime = None
+        self._checked_at = time.monotonic()
+        self._reload_lock = threading.Lock()
+        self._stats = {'loads': 0, 'failed_loads': 0, 'last_error': None, 'load_ms': None, 'loaded_at': None}
+        if not self.reload():
+            raise ValueError(f"Could not load disease knowledge base {path}: {self._stats['last_error']}")
+
+    def current(self):
+        """The engine to use for this request"""
+        now = time.monotonic()
+        if now - self._checked_at >= self.refresh_seconds:
+            self._checked_at = now
+            try:
+                changed = os.stat(self.path).st_mtime_ns != self._mtime
+            except OSError:
+                changed = False
+            # One thread recompiles; the others keep serving the current engine meanwhile
+            if changed and self._reload_lock.acquire(blocking=False):
+                try:
+                    self._load()
+                finally:
+                    self._reload_lock.release()
+        return self._engine
+
+    def reload(self):
+        """Recompile now; returns True if the file was loaded"""
+        with self._reload_lock:
+            return self._load()
+
+    def _load(self):
+        started_at = time.perf_counter()
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError as e:
+            mtime = None
+            engine, error = None, e
+        else:
+            try:
+                engine, error = SymptomScoringEngine.from_file(self.path), None
+            except Exception as e:
+                engine, error = None, e
+
+        # Either way this version of the file is not tried again until it changes
+        self._mtime = mtime
+        if engine is None:
+            self._stats['failed_loads'] += 1
+            self._stats['last_error'] = f"{type(error).__name__}: {error}"
+            logger.error(f"❌ Disease knowledge base not loaded, keeping the current version: {error}")
+            return False
+
+        load_ms = (time.perf_counter() - started_at) * 1000
+        self._engine = engine
+        self._stats.update(loads=self._stats['loads'] + 1, last_error=None, load_ms=round(load_ms, 2), loaded_at=time.time())
+        logger.info(f"✅ Disease knowledge base {engine.version} compiled in {load_ms:.1f} ms: "
+                    f"{engine.get_stats()['diseases']} diseases, {len(engine.symptoms)} symptoms")
+        return True
+
+    def get_stats(self):
+        return {**self._stats, 'path': self.path, **(self._engine.get_stats() if self._engine else {})}
+
+
+def synthetic_knowledge_base(species_count, diseases_per_species, symptom_count, links_per_disease=6, seed=0):
+    """A random knowledge base of the given size, for load benchmarks"""
+    rng = random.Random(seed)
+    symptoms = [f"symptom_{i}" for i in range(symptom_count)]
+    species = {}
+    for s in range(species_count):
+        diseases = [f"Disease {s}-{d}" for d in range(diseases_per_species)]
+        symptom_map = {}
+        for disease in diseases:
+            for symptom in rng.sample(symptoms, min(links_per_disease, symptom_count)):
+                link = disease if rng.random() < 0.7 else {'disease': disease, 'weight': rng.randint(5, 20)}
+                symptom_map.setdefault(symptom, []).append(link)
+        species[f"species_{s}"] = {'diseases': diseases, 'symptoms': symptom_map}
+    return {
+        'version': 'synthetic',
+        'scoring': {'base_score': 20, 'symptom_weight': 10, 'confidence_scale': 2, 'min_confidence': 60, 'max_confidence': 95},
+        'species': species,
+        'fallback': {'diseases': ['General Infection'], 'symptoms': {}},
+        'contagious_diseases': [species['species_0']['diseases'][0]],
+        'recommendations': {
+            'general': ['Consult with a veterinarian immediately for proper diagnosis'],
+            'symptom_rules': [{'symptoms': rng.sample(symptoms, 3), 'text': f"Rule {i}"} for i in range(50)],
+            'contagious': 'Isolate the animal to prevent disease spread'
+        }
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Validate and benchmark the disease knowledge base')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    validate_parser = subparsers.add_parser('validate', help='Check a knowledge base file and report its size')
+    validate_parser.add_argument('path', nargs='?', default=os.getenv('DISEASE_KB_PATH', DEFAULT_KNOWLEDGE_BASE_PATH))
+
+    benchmark_parser = subparsers.add_parser('benchmark', help='Time loading a synthetic knowledge base of a given size')
+    benchmark_parser.add_argument('--species', type=int, default=20)
+    benchmark_parser.add_argument('--diseases', type=int, default=40, help='diseases per species')
+    benchmark_parser.add_argument('--symptoms', type=int, default=300)
+    benchmark_parser.add_argument('--repeat', type=int, default=5)
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    if args.command == 'validate':
+        with open(args.path, encoding='utf-8') as f:
+            knowledge_base = json.load(f)
+        problems = validate_knowledge_base(knowledge_base)
+        if problems:
+            print(f"❌ {len(problems)} problem(s) in {args.path}:")
+            for problem in problems:
+                print(f"   - {problem}")
+            return 1
+        # Loaded like the app does, so the reported version matches /api/knowledge-base/status
+        print(json.dumps(SymptomScoringEngine.from_file(args.path).get_stats(), indent=2))
+        return 0
+
+    fd, path = tempfile.mkstemp(suffix='.json')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(synthetic_knowledge_base(args.species, args.diseases, args.symptoms), f)
+    try:
+        timings = []
+        for _ in range(args.repeat):
+            started_at = time.perf_counter()
+            engine = SymptomScoringEngine.from_file(path)
+            timings.append((time.perf_counter() - started_at) * 1000)
+        file_kb = os.path.getsize(path) / 1024
+    finally:
+        os.unlink(path)
+
+    cases = [(f"species_{i % args.species}", [f"symptom_{(i * 7 + j) % args.symptoms}" for j in range(4)])
+             for i in range(10000)]
+    started_at = time.perf_counter()
+    engine.predict_batch(cases)
+    batch_ms = (time.perf_counter() - started_at) * 1000
+
+    print(json.dumps({
+        **engine.get_stats(),
+        'file_kb': round(file_kb, 1),
+        'load_ms_median': round(statistics.median(timings), 2),
+        'load_ms_max': round(max(timings), 2),
+        'batch_10k_cases_ms': round(batch_ms, 1)
+    }, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,24 @@
+import pytest
+
+from translation_service import split_into_chunks
+
+
+@pytest.mark.parametrize('text', [
+    'First line.\nSecond line.\n\nThird paragraph.',
+    '\n\n' + 'a' * 100,
+    '  \n\n' + 'Short. ' * 40 + '\n',
+    'x' * 250 + '\n\n\n' + 'y' * 30,
+    '',
+])
+def test_chunks_are_bounded_and_rejoin_to_the_text(text):
+    chunks = split_into_chunks(text, 100)
+    assert ''.join(chunk + separator for chunk, separator in chunks) == text
+    assert all(len(chunk) <= 100 for chunk, _ in chunks)
+
+
+def test_leading_blank_lines_are_kept_out_of_the_first_chunk():
+    assert split_into_chunks('\n\n' + 'a' * 100, 100) == [('', '\n\n'), ('a' * 100, '')]
+
+
+def test_short_lines_share_a_chunk():
+    assert split_into_chunks('One.\nTwo.\nThree.', 100) == [('One.\nTwo.\nThree.', '')]
@@ -0,0 +1,247 @@
+import glob
+import multiprocessing
+import os
+import time
+
+import pytest
+from bson import json_util
+from pymongo.errors import AutoReconnect, BulkWriteError
+
+from write_behind import DUPLICATE_KEY, WriteBehindQueue
+
+
+class FakeCollection:
+    def __init__(self):
+        self.documents = {}
+        self.error = None
+
+    def insert_many(self, documents, ordered=True):
+        if self.error is not None:
+            raise self.error
+        write_errors = []
+        for index, document in enumerate(documents):
+            if document['_id'] in self.documents:
+                write_errors.append({'index': index, 'code': DUPLICATE_KEY, 'errmsg': 'duplicate key'})
+            else:
+                self.documents[document['_id']] = document
+        if write_errors:
+            raise BulkWriteError({'writeErrors': write_errors})
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.collections = {}
+
+    def __getitem__(self, name):
+        return self.collections.setdefault(name, FakeCollection())
+
+
+class Connection:
+    """Switchable database handle, like app.db before and after MongoDB connects"""
+
+    def __init__(self, database=None):
+        self.database = database
+
+    def __call__(self):
+        return self.database
+
+
+@pytest.fixture
+def journal_dir(tmp_path):
+    return str(tmp_path / 'journal')
+
+
+def make_queue(connection, journal_dir, **options):
+    options.setdefault('flush_interval', 0.01)
+    options.setdefault('max_retries', 0)
+    return WriteBehindQueue(connection, journal_dir=journal_dir, **options)
+
+
+def journal_files(journal_dir, pattern='journal-*.jsonl'):
+    return glob.glob(os.path.join(journal_dir, pattern))
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_documents_are_written_in_batches(journal_dir):
+    database = FakeDatabase()
+    queue = make_queue(Connection(database), journal_dir, batch_size=10)
+    queue.put_many('predictions', [{'n': n} for n in range(25)])
+
+    assert wait_for(lambda: queue.get_stats()['written'] == 25)
+    assert len(database['predictions'].documents) == 25
+    assert queue.get_stats()['pending'] == 0
+    queue.close()
+
+
+def test_unreachable_database_journals_and_replays_once_back(journal_dir):
+    connection = Connection()
+    queue = make_queue(connection, journal_dir)
+    queue.put('predictions', {'n': 1})
+    queue.put('conversations', {'n': 2})
+    queue.flush()
+
+    assert queue.get_stats()['journaled'] == 2
+    assert len(journal_files(journal_dir)) == 1
+
+    database = FakeDatabase()
+    connection.database = database
+    assert queue.replay_journal() == 2
+    assert len(database['predictions'].documents) == 1
+    assert len(database['conversations'].documents) == 1
+    assert journal_files(journal_dir) == []
+    queue.close()
+
+
+def test_failed_replay_keeps_the_journal_and_skips_duplicates_on_retry(journal_dir):
+    connection = Connection()
+    queue = make_queue(connection, journal_dir)
+    queue.put_many('predictions', [{'n': n} for n in range(3)])
+    queue.flush()
+
+    database = FakeDatabase()
+    database['predictions'].error = AutoReconnect('connection reset')
+    connection.database = database
+    assert queue.replay_journal() == 0
+    assert len(journal_files(journal_dir)) == 1
+
+    # One document made it in before the failure; the retry must not duplicate it
+    first = json_util.loads(open(journal_files(journal_dir)[0]).readline())['document']
+    database['predictions'].error = None
+    database['predictions'].documents[first['_id']] = first
+    assert queue.replay_journal() == 3
+    assert len(database['predictions'].documents) == 3
+    queue.close()
+
+
+def test_corrupt_journal_line_is_moved_aside(journal_dir):
+    connection = Connection()
+    queue = make_queue(connection, journal_dir)
+    queue.put_many('predictions', [{'n': n} for n in range(2)])
+    queue.flush()
+
+    # A crash in the middle of an append leaves a truncated last line
+    with open(journal_files(journal_dir)[0], 'a', encoding='utf-8') as f:
+        f.write('{"collection": "predictions", "document": {"_id": {"$oid"')
+
+    database = FakeDatabase()
+    connection.database = database
+    assert queue.replay_journal() == 2
+    assert queue.get_stats()['corrupt'] == 1
+    assert len(journal_files(journal_dir, 'journal-*.corrupt')) == 1
+    assert journal_files(journal_dir) == [] and journal_files(journal_dir, 'replaying-*') == []
+    queue.close()
+
+
+def test_flusher_survives_errors_and_keeps_writing(journal_dir):
+    database = FakeDatabase()
+    calls = []
+
+    def get_database():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError('unexpected')
+        return database
+
+    queue = make_queue(get_database, journal_dir, replay_interval=0)
+    queue.put('predictions', {'n': 1})
+    assert wait_for(lambda: queue.get_stats()['journaled'] + queue.get_stats()['written'] >= 1)
+
+    queue.put('predictions', {'n': 2})
+    assert wait_for(lambda: len(database['predictions'].documents) == 2)
+    assert queue._thread.is_alive()
+    queue.close()
+
+
+def test_replay_claimed_by_a_dead_process_is_reclaimed(journal_dir):
+    connection = Connection()
+    queue = make_queue(connection, journal_dir)
+    queue.put('predictions', {'n': 1})
+    queue.flush()
+
+    # Simulate a worker that died after claiming the file
+    path = journal_files(journal_dir)[0]
+    os.rename(path, os.path.join(journal_dir, 'replaying-999999999-abc.jsonl'))
+    live_claim = os.path.join(journal_dir, f'replaying-{os.getpid()}-def.jsonl')
+    open(live_claim, 'w').close()
+
+    connection.database = FakeDatabase()
+    assert queue.replay_journal() == 1
+    assert os.path.exists(live_claim)
+    queue.close()
+
+
+def test_disabled_persistence_discards_instead_of_journaling(journal_dir):
+    queue = make_queue(Connection(), journal_dir, enabled=False)
+    queue.put('predictions', {'n': 1})
+    queue.put_many('conversations', [{'n': 2}, {'n': 3}])
+    queue.close()
+
+    stats = queue.get_stats()
+    assert stats['discarded'] == 3
+    assert stats['queued'] == 0 and stats['journaled'] == 0
+    assert not os.path.exists(journal_dir)
+
+
+def test_journal_is_capped(journal_dir):
+    queue = make_queue(Connection(), journal_dir, max_journal_bytes=1000)
+    queue.put_many('predictions', [{'n': n, 'text': 'x' * 100} for n in range(20)])
+    queue.flush()
+
+    stats = queue.get_stats()
+    assert stats['journal_bytes'] <= 1000
+    assert stats['dropped'] == 20 - stats['journaled']
+    assert stats['dropped'] > 0
+    queue.close()
+
+
+def _journal_in_child(journal_dir, count):
+    queue = make_queue(Connection(), journal_dir)
+    for n in range(count):
+        queue._journal('predictions', [{'_id': n}])
+
+
+def test_replay_while_another_process_journals_loses_nothing(journal_dir):
+    count = 3000
+    writer = multiprocessing.get_context('fork').Process(target=_journal_in_child, args=(journal_dir, count))
+    database = FakeDatabase()
+    queue = make_queue(Connection(database), journal_dir)
+    writer.start()
+    while writer.is_alive():
+        queue.replay_journal()
+    writer.join()
+    queue.replay_journal()
+
+    assert writer.exitcode == 0
+    assert len(database['predictions'].documents) == count
+    queue.close()
+
+
+def _journal_forked(queue, result):
+    queue._journal('predictions', [{'n': 2}])
+    result.put(os.path.basename(queue._journal_path))
+
+
+def test_forked_workers_journal_to_their_own_files(journal_dir):
+    # Built before the fork, like app.write_queue under a preloading gunicorn master
+    queue = make_queue(Connection(), journal_dir)
+    queue._journal('predictions', [{'n': 1}])
+
+    context = multiprocessing.get_context('fork')
+    result = context.Queue()
+    worker = context.Process(target=_journal_forked, args=(queue, result))
+    worker.start()
+    child_file = result.get(timeout=10)
+    worker.join()
+
+    assert child_file.startswith(f'journal-{worker.pid}-')
+    assert os.path.basename(queue._journal_path).startswith(f'journal-{os.getpid()}-')
+    assert len(journal_files(journal_dir)) == 2
+    queue.close()
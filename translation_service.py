@@ -0,0 +1,145 @@
+import logging
+import re
+import threading
+
+from result_cache import make_cache_key
+
+logger = logging.getLogger(__name__)
+
+# Line breaks (with surrounding whitespace) are kept outside chunks so formatting survives translation
+_LINE_BREAK = re.compile(r'(\s*\n\s*)')
+_SENTENCE_BREAK = re.compile(r'(?<=[.!?।])(\s+)')
+
+
+def _split_long(segment, max_chars):
+    """Split a single over-long line on sentence boundaries, hard-cutting sentences that are still too long"""
+    pieces = []
+    parts = _SENTENCE_BREAK.split(segment)
+    for i in range(0, len(parts), 2):
+        sentence = parts[i]
+        separator = parts[i + 1] if i + 1 < len(parts) else ''
+        while len(sentence) > max_chars:
+            pieces.append((sentence[:max_chars], ''))
+            sentence = sentence[max_chars:]
+        pieces.append((sentence, separator))
+    return pieces
+
+
+def split_into_chunks(text, max_chars):
+    """
+    Split text into (chunk, separator) pairs with every chunk at most max_chars long,
+    breaking on lines first and sentences second. ''.join(chunk + separator) == text.
+    """
+    pieces = []
+    parts = _LINE_BREAK.split(text)
+    for i in range(0, len(parts), 2):
+        segment = parts[i]
+        separator = parts[i + 1] if i + 1 < len(parts) else ''
+        if len(segment) <= max_chars:
+            pieces.append((segment, separator))
+        else:
+            sentences = _split_long(segment, max_chars)
+            last_sentence, last_separator = sentences[-1]
+            sentences[-1] = (last_sentence, last_separator + separator)
+            pieces.extend(sentences)
+
+    # Pack neighbouring pieces back together so short lines share a round-trip
+    chunks = []
+    current, current_separator = '', ''
+    for piece, separator in pieces:
+        if current and len(current) + len(current_separator) + len(piece) > max_chars:
+            chunks.append((current, current_separator))
+            current, current_separator = piece, separator
+        elif current:
+            current, current_separator = current + current_separator + piece, separator
+        else:
+            # Leading blank lines stay a separator of their own rather than growing the first chunk
+            if current_separator:
+                chunks.append(('', current_separator))
+            current, current_separator = piece, separator
+    if current or current_separator:
+        chunks.append((current, current_separator))
+    return chunks
+
+
+class TranslationService:
+    """
+    Cached, chunked translation on the shared upstream executor.
+    Long texts are split on line/sentence boundaries and the chunks are translated concurrently;
+    every chunk is cached by (text, source, target) and translator clients are reused per thread.
+    """
+
+    def __init__(self, executor, cache, translator_factory, max_chunk_chars=1800, timeout=5):
+        """
+        executor: UpstreamExecutor the 'translation' calls run on
+        cache: ResultCache for translated chunks
+        translator_factory: callable(source, target) returning an object with translate(text)
+        """
+        self.executor = executor
+        self.cache = cache
+        self.translator_factory = translator_factory
+        self.max_chunk_chars = max_chunk_chars
+        self.timeout = timeout
+
+        self._clients = threading.local()
+        self._stats_lock = threading.Lock()
+        self._chunks_translated = 0
+        self._chunks_failed = 0
+
+    def _client(self, source_lang, target_lang):
+        """Translator for this thread and language pair (clients keep per-request state, so they are not shared)"""
+        clients = getattr(self._clients, 'by_pair', None)
+        if clients is None:
+            clients = self._clients.by_pair = {}
+        pair = (source_lang, target_lang)
+        if pair not in clients:
+            clients[pair] = self.translator_factory(source=source_lang, target=target_lang)
+        return clients[pair]
+
+    def translate(self, text, source_lang, target_lang, deadline=None):
+        """Translated text; chunks that fail or time out are left in the source language"""
+        chunks = split_into_chunks(text, self.max_chunk_chars)
+
+        translated = {}
+        pending = []
+        for chunk, _ in chunks:
+            if not chunk.strip() or chunk in translated:
+                continue
+            cached = self.cache.get(make_cache_key('translation', chunk.encode('utf-8'), source_lang, target_lang))
+            if cached is not None:
+                translated[chunk] = cached
+            else:
+                translated[chunk] = None
+                pending.append(chunk)
+
+        if pending:
+            def translate_chunk(chunk):
+                return self._client(source_lang, target_lang).translate(chunk)
+
+            results = self.executor.call_many('translation', translate_chunk, pending,
+                                              timeout=self.timeout, deadline=deadline)
+            failed = 0
+            for chunk, result in zip(pending, results):
+                if isinstance(result, Exception) or not result:
+                    failed += 1
+                    if isinstance(result, Exception):
+                        logger.warning(f"⚠️ Translation chunk failed ({source_lang} → {target_lang}): {result}")
+                    continue
+                translated[chunk] = result
+                self.cache.set(make_cache_key('translation', chunk.encode('utf-8'), source_lang, target_lang), result)
+
+            with self._stats_lock:
+                self._chunks_translated += len(pending) - failed
+                self._chunks_failed += failed
+
+        return ''.join((translated.get(chunk) or chunk) + separator for chunk, separator in chunks)
+
+    def get_stats(self):
+        with self._stats_lock:
+            stats = {
+                'chunks_translated': self._chunks_translated,
+                'chunks_failed': self._chunks_failed,
+                'max_chunk_chars': self.max_chunk_chars
+            }
+        stats['cache'] = self.cache.get_stats()
+        return stats
@@ -0,0 +1,225 @@
+import logging
+import os
+import queue
+import re
+import threading
+import time
+import uuid
+
+from PIL import ImageOps
+
+from image_preprocessing import decode_image
+from result_cache import content_hash
+from upload_streams import SNIFF_BYTES, sniff_kind
+
+logger = logging.getLogger(__name__)
+
+# Stored file extension per sniffed image format
+EXTENSIONS = {'jpeg': 'jpg', 'png': 'png', 'webp': 'webp'}
+# Resized WebP copies: variant -> (longest side, quality)
+DERIVATIVES = {'thumb': (256, 70), 'display': (1024, 80)}
+
+_DIGEST = re.compile(r'^[0-9a-f]{40}$')
+# Files saved by the old uuid4 + filename scheme
+_LEGACY_NAME = re.compile(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}_')
+# Leftovers of interrupted writes older than this are removed by the collector
+_STALE_TEMP_SECONDS = 3600
+
+
+class UploadStore:
+    """
+    Content-addressed store for uploaded photos. Each distinct photo is written once, named by
+    its content hash in hash-sharded directories (ab/cd/<digest>.jpg), so identical uploads share a
+    file. Resized WebP copies for display are made by a background worker.
+
+    Retention is by last use (file mtime, refreshed when the same photo is uploaded again):
+    originals are deleted after original_retention_days and the smaller derivatives after
+    retention_days. The collector runs from the worker every gc_interval seconds.
+    """
+
+    def __init__(self, root='data/uploads', derivatives=DERIVATIVES, max_pending=1000,
+                 original_retention_days=30, retention_days=365, gc_interval=6 * 3600):
+        self.root = root
+        self.derivatives = dict(derivatives)
+        self.original_retention = original_retention_days * 86400
+        self.retention = retention_days * 86400
+        self.gc_interval = gc_interval
+
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._lock = threading.Lock()
+        self._last_gc = time.monotonic()
+        self._stats = {
+            'stored': 0, 'deduplicated': 0, 'bytes_written': 0, 'derivatives': 0,
+            'derivative_errors': 0, 'queue_full': 0, 'gc_runs': 0, 'gc_removed': 0, 'gc_bytes': 0
+        }
+
+        # Started with the first upload so it is not lost across a preloading gunicorn fork
+        self._thread = None
+
+    def _directory(self, digest):
+        return os.path.join(self.root, digest[:2], digest[2:4])
+
+    def path(self, digest, variant='original'):
+        """Path of a stored photo or derivative, or None when it does not exist"""
+        if not _DIGEST.match(digest or ''):
+            return None
+        directory = self._directory(digest)
+        if variant == 'original':
+            candidates = [os.path.join(directory, f'{digest}.{ext}') for ext in EXTENSIONS.values()]
+        elif variant in self.derivatives:
+            candidates = [os.path.join(directory, f'{digest}.{variant}.webp')]
+        else:
+            return None
+        return next((candidate for candidate in candidates if os.path.exists(candidate)), None)
+
+    def put(self, data):
+        """
+        Store a photo (bytes or any bytes-like object); returns its digest, or None when the data
+        is not a supported image. Existing copies are only marked as used.
+        """
+        ext = EXTENSIONS.get(sniff_kind(bytes(data[:SNIFF_BYTES])))
+        if ext is None:
+            return None
+        digest = content_hash(data)
+        directory = self._directory(digest)
+        path = os.path.join(directory, f'{digest}.{ext}')
+
+        try:
+            os.utime(path)
+            deduplicated = True
+        except FileNotFoundError:
+            os.makedirs(directory, exist_ok=True)
+            temp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            # Concurrent uploads of the same photo each write a temp file; the last rename wins
+            os.replace(temp_path, path)
+            deduplicated = False
+
+        missing = False
+        for variant in self.derivatives:
+            try:
+                os.utime(os.path.join(directory, f'{digest}.{variant}.webp'))
+            except FileNotFoundError:
+                missing = True
+
+        with self._lock:
+            if deduplicated:
+                self._stats['deduplicated'] += 1
+            else:
+                self._stats['stored'] += 1
+                self._stats['bytes_written'] += len(data)
+        if missing:
+            self.schedule(digest)
+        return digest
+
+    def schedule(self, digest):
+        """Queue derivative generation; skipped (and retried on a later upload or view) when the queue is full"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='upload-derivatives', daemon=True)
+                self._thread.start()
+        try:
+            self._queue.put_nowait(digest)
+        except queue.Full:
+            with self._lock:
+                self._stats['queue_full'] += 1
+
+    def _run(self):
+        while True:
+            try:
+                digest = self._queue.get(timeout=60)
+            except queue.Empty:
+                digest = None
+            if digest is not None:
+                try:
+                    self.make_derivatives(digest)
+                except Exception as e:
+                    logger.warning(f"⚠️  Could not create derivatives of {digest}: {e}")
+                    with self._lock:
+                        self._stats['derivative_errors'] += 1
+            if time.monotonic() - self._last_gc >= self.gc_interval:
+                self._last_gc = time.monotonic()
+                try:
+                    self.collect_garbage()
+                except Exception as e:
+                    logger.warning(f"⚠️  Upload garbage collection failed: {e}")
+
+    def make_derivatives(self, digest):
+        """Write the missing WebP derivatives of a stored photo; returns how many were written"""
+        original = self.path(digest)
+        if original is None:
+            return 0
+        directory = self._directory(digest)
+        missing = {variant: size for variant, size in self.derivatives.items()
+                   if not os.path.exists(os.path.join(directory, f'{digest}.{variant}.webp'))}
+        if not missing:
+            return 0
+
+        with open(original, 'rb') as f:
+            data = f.read()
+        # Decoded once at the largest size needed; EXIF is applied for orientation and not copied,
+        # so derivatives carry no camera or location metadata
+        image = ImageOps.exif_transpose(decode_image(data, target_size=max(side for side, _ in missing.values())))
+        for variant, (side, quality) in missing.items():
+            resized = image.copy()
+            resized.thumbnail((side, side))
+            path = os.path.join(directory, f'{digest}.{variant}.webp')
+            temp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+            resized.save(temp_path, 'WEBP', quality=quality, method=4)
+            os.replace(temp_path, path)
+        with self._lock:
+            self._stats['derivatives'] += len(missing)
+        return len(missing)
+
+    def collect_garbage(self, legacy_dir=None):
+        """
+        Delete originals and derivatives not used within their retention period, stale temp files
+        and emptied shard directories. legacy_dir: also expire uuid-named files of the old flat layout.
+        Returns the number of files and bytes removed.
+        """
+        now = time.time()
+        removed = freed = 0
+
+        def expire(path, max_age):
+            nonlocal removed, freed
+            try:
+                stat = os.stat(path)
+                if now - stat.st_mtime > max_age:
+                    os.remove(path)
+                    removed += 1
+                    freed += stat.st_size
+            except FileNotFoundError:
+                pass
+
+        for directory, subdirectories, files in os.walk(self.root, topdown=False):
+            for name in files:
+                if name.endswith('.tmp'):
+                    max_age = _STALE_TEMP_SECONDS
+                elif name.endswith('.webp') and name.count('.') == 2:
+                    max_age = self.retention
+                else:
+                    max_age = self.original_retention
+                expire(os.path.join(directory, name), max_age)
+            if directory != self.root:
+                try:
+                    os.rmdir(directory)
+                except OSError:
+                    pass
+
+        if legacy_dir and os.path.isdir(legacy_dir):
+            for name in os.listdir(legacy_dir):
+                if _LEGACY_NAME.match(name):
+                    expire(os.path.join(legacy_dir, name), self.original_retention)
+
+        with self._lock:
+            self._stats['gc_runs'] += 1
+            self._stats['gc_removed'] += removed
+            self._stats['gc_bytes'] += freed
+        if removed:
+            logger.info(f"🧹 Removed {removed} expired upload file(s), {freed / 1024 / 1024:.1f} MB")
+        return {'removed': removed, 'bytes': freed}
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self._stats, pending=self._queue.qsize(), root=self.root)
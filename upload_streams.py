@@ -0,0 +1,138 @@
+import io
+import mmap
+import tempfile
+
+from werkzeug.exceptions import HTTPException
+
+
+# Leading bytes needed to recognise every supported format (WebP's tag is at offset 8)
+SNIFF_BYTES = 12
+
+_IMAGE_KINDS = ('jpeg', 'png', 'webp')
+_SIGNATURES = {
+    'jpeg': lambda head: head.startswith(b'\xff\xd8\xff'),
+    'png': lambda head: head.startswith(b'\x89PNG\r\n\x1a\n'),
+    'webp': lambda head: head[:4] == b'RIFF' and head[8:12] == b'WEBP',
+    'pdf': lambda head: head.startswith(b'%PDF-'),
+    'zip': lambda head: head[:4] in (b'PK\x03\x04', b'PK\x05\x06'),
+}
+# Any image format is accepted under any image extension (phones often save PNGs as .jpg)
+EXTENSION_KINDS = {
+    'jpg': _IMAGE_KINDS, 'jpeg': _IMAGE_KINDS, 'png': _IMAGE_KINDS, 'webp': _IMAGE_KINDS,
+    'pdf': ('pdf',),
+    'zip': ('zip',),
+}
+
+
+class UploadRejected(HTTPException):
+    """An uploaded file whose content does not match its extension"""
+    code = 415
+
+    def __init__(self, filename, expected):
+        super().__init__(f"{filename} is not a valid {'/'.join(kind.upper() for kind in expected)} file")
+
+
+def sniff_kind(head):
+    """Format of a file from its first SNIFF_BYTES bytes, or None"""
+    for kind, matches in _SIGNATURES.items():
+        if matches(head):
+            return kind
+    return None
+
+
+def expected_kinds(filename):
+    """Formats allowed for a file name, or None when its extension is not checked"""
+    if not filename or '.' not in filename:
+        return None
+    return EXTENSION_KINDS.get(filename.rsplit('.', 1)[1].lower())
+
+
+class SpooledUpload(tempfile.SpooledTemporaryFile):
+    """
+    Target for one multipart file part: kept in memory up to max_size, then rolled over to an
+    (unlinked) temp file. The first bytes are checked against the file's extension as they
+    arrive, so a mislabelled upload is rejected before the rest of the body is read.
+    """
+
+    def __init__(self, filename, max_size):
+        super().__init__(max_size=max_size)
+        self.filename = filename
+        self.expected = expected_kinds(filename)
+        self._head = b''
+        self.verified = self.expected is None
+
+    def write(self, data):
+        if not self.verified:
+            self._head += bytes(data[:SNIFF_BYTES - len(self._head)])
+            if len(self._head) >= SNIFF_BYTES:
+                self.verify()
+        return super().write(data)
+
+    def verify(self):
+        """Check the leading bytes (called again once the part is complete, for very small files)"""
+        if self.verified:
+            return
+        self.verified = True
+        if not any(_SIGNATURES[kind](self._head) for kind in self.expected):
+            raise UploadRejected(self.filename, self.expected)
+
+    @property
+    def on_disk(self):
+        return self._rolled
+
+
+def upload_buffer(file_storage):
+    """
+    Contents of an uploaded file without copying file-backed data into memory: a read-only
+    memoryview over an mmap of the (spooled) file, or bytes for uploads kept in memory.
+    The mapping stays valid after the file is closed, so it can be handed to jobs.
+    """
+    stream = file_storage.stream
+    in_memory = isinstance(stream, SpooledUpload) and not stream.on_disk
+    if not in_memory:
+        try:
+            fd = stream.fileno()
+        except (AttributeError, io.UnsupportedOperation):
+            fd = None
+        if fd is not None:
+            stream.flush()
+            size = stream.seek(0, io.SEEK_END)
+            if size:
+                return memoryview(mmap.mmap(fd, size, access=mmap.ACCESS_READ))
+    stream.seek(0)
+    return stream.read()
+
+
+class _BufferReader(io.RawIOBase):
+    """Raw stream over a bytes-like object, read into callers' buffers without intermediate copies"""
+
+    def __init__(self, buffer):
+        self._view = memoryview(buffer).cast('B')
+        self._position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, target):
+        chunk = self._view[self._position:self._position + len(target)]
+        target[:len(chunk)] = chunk
+        self._position += len(chunk)
+        return len(chunk)
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._position, io.SEEK_END: len(self._view)}[whence]
+        self._position = max(base + offset, 0)
+        return self._position
+
+    def tell(self):
+        return self._position
+
+
+def open_buffer(buffer):
+    """Seekable binary file over bytes, a memoryview or an mmap (one independent reader per call)"""
+    if isinstance(buffer, bytes):
+        return io.BytesIO(buffer)  # shares the bytes object, no copy
+    return io.BufferedReader(_BufferReader(buffer))
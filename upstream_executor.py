@@ -0,0 +1,162 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class UpstreamBusyError(Exception):
+    """No in-flight slot for the upstream became free before the deadline"""
+
+
+class UpstreamTimeoutError(Exception):
+    """The upstream call did not finish before the deadline"""
+
+
+class Deadline:
+    """Absolute time budget shared by every upstream call made while serving one request"""
+
+    def __init__(self, seconds):
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self, cap=None):
+        """Seconds left, optionally capped by a per-call timeout"""
+        remaining = max(0.0, self.expires_at - time.monotonic())
+        return remaining if cap is None else min(remaining, cap)
+
+    @property
+    def expired(self):
+        return self.remaining() <= 0
+
+
+class UpstreamExecutor:
+    """
+    Shared, size-bounded executor for outbound AI calls (Gemini, translation).
+    Each upstream has a cap on in-flight calls. A slot is only released when the underlying call
+    really finishes, so work abandoned on timeout still counts against the cap instead of piling up.
+    """
+
+    def __init__(self, max_workers=16, limits=None, default_limit=4):
+        self.limits = dict(limits or {})
+        self.default_limit = default_limit
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='upstream')
+
+        self._lock = threading.Lock()
+        self._semaphores = {}
+        self._stats = {}
+
+    def _upstream(self, upstream):
+        with self._lock:
+            if upstream not in self._semaphores:
+                self._semaphores[upstream] = threading.BoundedSemaphore(self.limits.get(upstream, self.default_limit))
+                self._stats[upstream] = {
+                    'in_flight': 0, 'calls': 0, 'completed': 0, 'rejected': 0, 'cancelled': 0, 'abandoned': 0
+                }
+            return self._semaphores[upstream]
+
+    def _count(self, upstream, key, delta=1):
+        with self._lock:
+            self._stats[upstream][key] += delta
+
+    def _acquire(self, upstream, budget):
+        semaphore = self._upstream(upstream)
+        if not semaphore.acquire(timeout=budget):
+            self._count(upstream, 'rejected')
+            raise UpstreamBusyError(f'Too many in-flight {upstream} calls')
+        self._count(upstream, 'in_flight')
+        self._count(upstream, 'calls')
+        return semaphore
+
+    def _release(self, upstream, semaphore):
+        self._count(upstream, 'in_flight', -1)
+        semaphore.release()
+
+    def _submit(self, upstream, fn, args, kwargs, budget):
+        semaphore = self._acquire(upstream, budget)
+
+        def on_done(future):
+            if not future.cancelled():
+                self._count(upstream, 'completed')
+            self._release(upstream, semaphore)
+
+        try:
+            future = self._executor.submit(fn, *args, **kwargs)
+        except Exception:
+            self._release(upstream, semaphore)
+            raise
+        future.add_done_callback(on_done)
+        return future
+
+    def _wait(self, upstream, future, budget, started_at):
+        try:
+            return future.result(timeout=max(0.0, budget - (time.monotonic() - started_at)))
+        except FuturesTimeoutError:
+            if future.cancel():
+                self._count(upstream, 'cancelled')
+            else:
+                self._count(upstream, 'abandoned')
+            logger.warning(f"⚡ {upstream} call exceeded its {budget:.1f}s budget")
+            raise UpstreamTimeoutError(f'{upstream} call timed out')
+
+    def call(self, upstream, fn, *args, timeout, deadline=None, **kwargs):
+        """
+        Run fn on the shared executor and wait at most min(timeout, deadline remaining).
+        Work that has not started by then is cancelled; work already running is abandoned
+        and keeps its slot until it returns.
+        """
+        budget = timeout if deadline is None else deadline.remaining(timeout)
+        if budget <= 0:
+            raise UpstreamTimeoutError(f'No time left for {upstream} call')
+
+        started_at = time.monotonic()
+        future = self._submit(upstream, fn, args, kwargs, budget)
+        return self._wait(upstream, future, budget, started_at)
+
+    def call_many(self, upstream, fn, items, timeout, deadline=None):
+        """
+        Run fn(item) for every item concurrently under the same budget and in-flight cap.
+        Returns results in item order; a call that failed or ran out of time yields its exception instead.
+        """
+        budget = timeout if deadline is None else deadline.remaining(timeout)
+        started_at = time.monotonic()
+
+        futures = []
+        for item in items:
+            remaining = budget - (time.monotonic() - started_at)
+            try:
+                if remaining <= 0:
+                    raise UpstreamTimeoutError(f'No time left for {upstream} call')
+                futures.append(self._submit(upstream, fn, (item,), {}, remaining))
+            except (UpstreamBusyError, UpstreamTimeoutError) as e:
+                futures.append(e)
+
+        results = []
+        for future in futures:
+            if isinstance(future, Exception):
+                results.append(future)
+                continue
+            try:
+                results.append(self._wait(upstream, future, budget, started_at))
+            except Exception as e:
+                results.append(e)
+        return results
+
+    @contextmanager
+    def limit(self, upstream, timeout, deadline=None):
+        """Hold an in-flight slot for work run on the caller's own thread (e.g. a streaming response)"""
+        budget = timeout if deadline is None else deadline.remaining(timeout)
+        semaphore = self._acquire(upstream, budget)
+        try:
+            yield
+            self._count(upstream, 'completed')
+        finally:
+            self._release(upstream, semaphore)
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                upstream: {**stats, 'limit': self.limits.get(upstream, self.default_limit)}
+                for upstream, stats in self._stats.items()
+            }
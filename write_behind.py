@@ -0,0 +1,364 @@
+import atexit
+import glob
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+
+from bson import ObjectId, json_util
+from pymongo.errors import BulkWriteError, ConnectionFailure, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+# Serializes journal appends and replay claims across worker processes (POSIX only; single-process elsewhere)
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+DUPLICATE_KEY = 11000
+
+
+def _is_transient(error):
+    """Errors worth retrying: lost connections, timeouts and writes the server marks as retryable"""
+    if isinstance(error, ConnectionFailure):
+        return True
+    return isinstance(error, PyMongoError) and error.has_error_label('RetryableWriteError')
+
+
+class WriteBehindQueue:
+    """
+    Buffers documents off the request path and writes them to MongoDB with insert_many on a
+    background flusher. Every document gets its _id up front, so retried and replayed batches are
+    idempotent. Batches that cannot be written (database unreachable, retries exhausted, queue full)
+    are appended to a local JSON-lines journal and replayed once the database is back.
+    """
+
+    def __init__(self, get_database, batch_size=100, flush_interval=0.5, max_pending=10000,
+                 max_retries=3, journal_dir='data/write_journal', replay_interval=30,
+                 max_journal_bytes=100 * 1024 * 1024, enabled=True):
+        """
+        get_database: callable returning the pymongo Database, or None while it is unavailable
+        max_journal_bytes: total size of the journal files; documents that would exceed it are dropped
+        enabled: False when there is no database to write to at all (pymongo missing); documents are
+            then discarded instead of journaled, since the journal could never be replayed
+        """
+        self.enabled = enabled
+        self.get_database = get_database
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_retries = max_retries
+        self.journal_dir = journal_dir
+        self.replay_interval = replay_interval
+        self.max_journal_bytes = max_journal_bytes
+
+        self._pending = OrderedDict()
+        self._pending_count = 0
+        self._changed = threading.Condition()
+        self._journal_lock = threading.Lock()
+        # Named on first use, so workers forked from a preloading master each get their own file
+        self._journal_pid = None
+        self._journal_path = None
+        self._closed = False
+        self._last_replay = 0.0
+        self._reclaimed = False
+
+        self._stats = {
+            'queued': 0, 'written': 0, 'batches': 0, 'retries': 0, 'journaled': 0, 'replayed': 0,
+            'corrupt': 0, 'failed': 0, 'dropped': 0, 'discarded': 0
+        }
+
+        # The flusher starts with the first document, so a preloading gunicorn master does not
+        # start a thread that its forked workers would not inherit
+        self._thread = None
+        atexit.register(self.close)
+
+    def put(self, collection_name, document):
+        """Queue a document for insertion; never blocks on the database"""
+        if not self.enabled:
+            with self._changed:
+                self._stats['discarded'] += 1
+            return
+        document.setdefault('_id', ObjectId())
+        with self._changed:
+            if self._closed or self._pending_count >= self.max_pending:
+                overflow = True
+            else:
+                overflow = False
+                self._pending.setdefault(collection_name, deque()).append(document)
+                self._pending_count += 1
+                self._stats['queued'] += 1
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+                    self._thread.start()
+                if self._pending_count >= self.batch_size:
+                    self._changed.notify()
+        if overflow:
+            # Keep memory bounded: documents that do not fit go straight to the journal
+            self._journal(collection_name, [document])
+
+    def put_many(self, collection_name, documents):
+        """Queue several documents at once; they are flushed together as one insert_many where possible"""
+        for document in documents:
+            self.put(collection_name, document)
+        with self._changed:
+            self._changed.notify()
+
+    def _take_batches(self):
+        """Up to batch_size documents per collection (caller holds the lock)"""
+        batches = []
+        for collection_name, documents in self._pending.items():
+            batch = [documents.popleft() for _ in range(min(self.batch_size, len(documents)))]
+            if batch:
+                batches.append((collection_name, batch))
+                self._pending_count -= len(batch)
+        for collection_name in [name for name, documents in self._pending.items() if not documents]:
+            del self._pending[collection_name]
+        return batches
+
+    def _run(self):
+        while True:
+            with self._changed:
+                if self._pending_count < self.batch_size and not self._closed:
+                    self._changed.wait(self.flush_interval)
+                if self._closed:
+                    return
+                batches = self._take_batches()
+
+            # Nothing may end this loop: a dead flusher would leave every later document unwritten
+            for collection_name, batch in batches:
+                try:
+                    self._write_batch(collection_name, batch)
+                except Exception as e:
+                    logger.error(f"❌ Unexpected error writing {collection_name} documents: {e}")
+                    self._journal(collection_name, batch)
+
+            if time.monotonic() - self._last_replay >= self.replay_interval:
+                self._last_replay = time.monotonic()
+                try:
+                    self.replay_journal()
+                except Exception as e:
+                    logger.error(f"❌ Journal replay failed: {e}")
+
+    def _write_batch(self, collection_name, batch):
+        """Insert a batch, retrying transient failures before spilling it to the journal"""
+        for attempt in range(self.max_retries + 1):
+            database = self.get_database()
+            if database is None:
+                break
+            try:
+                self._insert(database[collection_name], batch)
+                with self._changed:
+                    self._stats['written'] += len(batch)
+                    self._stats['batches'] += 1
+                return True
+            except Exception as e:
+                if not _is_transient(e):
+                    logger.error(f"❌ Dropping {len(batch)} {collection_name} document(s) after a write error: {e}")
+                    with self._changed:
+                        self._stats['failed'] += len(batch)
+                    return False
+                if attempt < self.max_retries:
+                    with self._changed:
+                        self._stats['retries'] += 1
+                    time.sleep(min(0.2 * 2 ** attempt, 2.0))
+                else:
+                    logger.warning(f"⚠️  MongoDB write failed after {self.max_retries} retries: {e}")
+
+        self._journal(collection_name, batch)
+        return False
+
+    @staticmethod
+    def _insert(collection, batch):
+        try:
+            collection.insert_many(batch, ordered=False)
+        except BulkWriteError as e:
+            # Documents already written by an earlier attempt or replay are fine
+            errors = [error for error in e.details.get('writeErrors', []) if error.get('code') != DUPLICATE_KEY]
+            if errors:
+                raise
+
+    def _journal(self, collection_name, documents):
+        """Append documents to this process's journal file, unless that would exceed max_journal_bytes"""
+        try:
+            lines = [json_util.dumps({'collection': collection_name, 'document': document}) + '\n'
+                     for document in documents]
+            size = sum(len(line.encode('utf-8')) for line in lines)
+            with self._journal_lock:
+                lock_file = self._directory_lock()
+                try:
+                    if self._journal_size() + size > self.max_journal_bytes:
+                        logger.error(f"❌ Write journal is full, dropping {len(documents)} {collection_name} document(s)")
+                        with self._changed:
+                            self._stats['dropped'] += len(documents)
+                        return
+                    with open(self._own_journal_path(), 'a', encoding='utf-8') as f:
+                        f.writelines(lines)
+                finally:
+                    lock_file.close()
+            with self._changed:
+                self._stats['journaled'] += len(documents)
+            logger.warning(f"💾 Journaled {len(documents)} {collection_name} document(s) for later replay")
+        except Exception as e:
+            logger.error(f"❌ Could not journal {len(documents)} {collection_name} document(s): {e}")
+            with self._changed:
+                self._stats['dropped'] += len(documents)
+
+    def _own_journal_path(self):
+        """This process's journal file, renamed whenever the pid changes (after a fork)"""
+        if self._journal_pid != os.getpid():
+            self._journal_pid = os.getpid()
+            self._journal_path = os.path.join(self.journal_dir, f'journal-{self._journal_pid}-{uuid.uuid4().hex[:8]}.jsonl')
+        return self._journal_path
+
+    def _directory_lock(self):
+        """
+        Exclusive lock on the journal directory, held by every append and every replay claim, so no
+        process can append to a file after another has claimed it for replay (caller closes the file)
+        """
+        os.makedirs(self.journal_dir, exist_ok=True)
+        lock_file = open(os.path.join(self.journal_dir, '.lock'), 'w')
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        return lock_file
+
+    def _journal_size(self):
+        """Bytes in the journal files of every process, including ones being replayed"""
+        total = 0
+        for pattern in ('journal-*.jsonl', 'replaying-*.jsonl'):
+            for path in glob.glob(os.path.join(self.journal_dir, pattern)):
+                try:
+                    total += os.path.getsize(path)
+                except OSError:
+                    pass
+        return total
+
+    def reclaim_replays(self):
+        """
+        Hand back journal files left claimed by a process that died while replaying them
+        (replaying-<pid>-<id>.jsonl whose pid is gone), so they are replayed again
+        """
+        reclaimed = 0
+        for path in glob.glob(os.path.join(self.journal_dir, 'replaying-*.jsonl')):
+            owner = os.path.basename(path).split('-')[1]
+            if owner.isdigit() and _process_alive(int(owner)):
+                continue
+            try:
+                os.rename(path, os.path.join(self.journal_dir, f'journal-retry-{uuid.uuid4().hex}.jsonl'))
+                reclaimed += 1
+            except OSError:
+                continue
+        if reclaimed:
+            logger.info(f"🔄 Reclaimed {reclaimed} interrupted journal replay(s)")
+        return reclaimed
+
+    def _read_journal(self, path):
+        """Documents per collection from a journal file; unreadable lines (e.g. a write cut short by a crash) are moved aside"""
+        batches = OrderedDict()
+        corrupt = []
+        with open(path, encoding='utf-8', errors='replace') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    entry = json_util.loads(line)
+                    batches.setdefault(entry['collection'], []).append(entry['document'])
+                except Exception:
+                    corrupt.append(line if line.endswith('\n') else line + '\n')
+
+        if corrupt:
+            corrupt_path = os.path.join(self.journal_dir, f'journal-{uuid.uuid4().hex}.corrupt')
+            with open(corrupt_path, 'w', encoding='utf-8') as f:
+                f.writelines(corrupt)
+            with self._changed:
+                self._stats['corrupt'] += len(corrupt)
+            logger.error(f"❌ Moved {len(corrupt)} unreadable journal line(s) to {corrupt_path}")
+        return batches
+
+    def replay_journal(self):
+        """Write journaled documents from any process once MongoDB is reachable again"""
+        database = self.get_database()
+        if database is None:
+            return 0
+
+        if not self._reclaimed:
+            self._reclaimed = True
+            self.reclaim_replays()
+
+        replayed = 0
+        for path in sorted(glob.glob(os.path.join(self.journal_dir, 'journal-*.jsonl'))):
+            # Claim the file by renaming it, so only one worker replays it. Appends hold the same lock
+            # and open the file by name, so nothing is written to it once it is claimed.
+            claimed = os.path.join(self.journal_dir, f'replaying-{os.getpid()}-{uuid.uuid4().hex}.jsonl')
+            with self._journal_lock:
+                lock_file = self._directory_lock()
+                try:
+                    os.rename(path, claimed)
+                except OSError:
+                    continue
+                finally:
+                    lock_file.close()
+
+            try:
+                for collection_name, documents in self._read_journal(claimed).items():
+                    for start in range(0, len(documents), self.batch_size):
+                        self._insert(database[collection_name], documents[start:start + self.batch_size])
+                        replayed += len(documents[start:start + self.batch_size])
+            except Exception as e:
+                # Hand the file back for the next attempt; already written documents are skipped as duplicates
+                logger.warning(f"⚠️  Journal replay failed, will retry: {e}")
+                os.rename(claimed, os.path.join(self.journal_dir, f'journal-retry-{uuid.uuid4().hex}.jsonl'))
+                break
+            os.unlink(claimed)
+
+        if replayed:
+            with self._changed:
+                self._stats['replayed'] += replayed
+            logger.info(f"✅ Replayed {replayed} journaled document(s)")
+        return replayed
+
+    def flush(self):
+        """Write everything queued so far on the calling thread"""
+        while True:
+            with self._changed:
+                batches = self._take_batches()
+            if not batches:
+                return
+            for collection_name, batch in batches:
+                self._write_batch(collection_name, batch)
+
+    def close(self):
+        """Stop the flusher and flush (or journal) whatever is still queued; registered with atexit"""
+        with self._changed:
+            if self._closed:
+                return
+            self._closed = True
+            self._changed.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self.flush()
+
+    def get_stats(self):
+        with self._changed:
+            return {
+                **self._stats,
+                'pending': self._pending_count,
+                'max_pending': self.max_pending,
+                'enabled': self.enabled,
+                'journal_files': len(glob.glob(os.path.join(self.journal_dir, 'journal-*.jsonl'))),
+                'journal_bytes': self._journal_size(),
+                'max_journal_bytes': self.max_journal_bytes
+            }
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True